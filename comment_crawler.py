@@ -0,0 +1,217 @@
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime
+
+import aiohttp
+
+HOTFLOW_URL = 'https://m.weibo.cn/comments/hotflow'
+# 热搜话题的搜索结果页，快照中的ID是话题（如 %23高考%23），需要从这里解析出微博的 mid
+TOPIC_URL = 'https://s.weibo.com/weibo?q={}'
+MID_RE = re.compile(r'\bmid="(\d+)"')
+# 默认输出目录，评论合并脚本除当前目录外也扫描这里（与 merge_pipeline.COMMENTS_DIR 一致）
+COMMENTS_DIR = 'weibo_comments'
+
+# 请求头，Cookie 从环境变量 WEIBO_COOKIE 读取
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/101.0.0.0 Safari/537.36',
+}
+if os.environ.get('WEIBO_COOKIE'):
+    HEADERS['Cookie'] = os.environ['WEIBO_COOKIE']
+
+
+def parse_comment(comment):
+    """把 hotflow 接口返回的单条评论转换为评论信息字典"""
+    # 获取用户信息
+    user = comment.get('user') or {}
+
+    # 提取纯中文评论内容
+    content = ''.join(re.findall('[\u4e00-\u9fa5]+', comment.get('text', '')))
+
+    # 转换性别代码为中文
+    gender = '女' if user.get('gender') == 'f' else '男' if user.get('gender') == 'm' else '未知'
+
+    return {
+        '用户': user.get('screen_name', '未知用户'),
+        '性别': gender,
+        'svip': user.get('svip', 0),  # 0表示非SVIP，1表示SVIP
+        '地区': comment.get('source', '').replace('来自', '').strip() or '未知',
+        '评论': content,
+        '日期': comment.get('created_at', '未知日期')
+    }
+
+
+def extract_post_mids(html, limit=None):
+    """从话题搜索结果页中按出现顺序提取不重复的微博 mid"""
+    mids = list(dict.fromkeys(MID_RE.findall(html)))
+    return mids[:limit] if limit else mids
+
+
+def is_post_id(value):
+    """纯数字的ID视为微博 mid，否则视为热搜话题"""
+    return str(value).isdigit()
+
+
+class RateLimiter:
+    """按主机限速：同一主机两次请求之间至少间隔 1/rate 秒"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = {}
+        self._locks = {}
+
+    async def wait(self, host):
+        if not self.interval:
+            return
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            now = time.monotonic()
+            ready = self._next.get(host, now)
+            if ready > now:
+                await asyncio.sleep(ready - now)
+            self._next[host] = max(ready, now) + self.interval
+
+
+class CommentCrawler:
+    """异步热评抓取器
+
+    复用一个连接池会话，按 max_id 翻页直到结束；同时抓取的微博数由
+    concurrency 限制，同一主机的请求频率由 rate 限制（次/秒），失败的请求
+    按指数退避重试。接口返回 ok != 1 时可能是限流，先退避重试 empty_retries 次，
+    仍然如此才视为没有更多评论。热搜话题ID先从搜索结果页解析出前 posts_per_topic
+    条微博的 mid 再抓取。每条评论解析后立即以 JSON Lines 追加写入 output_path，
+    merge_pipeline 可以直接读取 .jsonl 文件。
+    """
+
+    def __init__(self, output_path, concurrency=5, rate=2.0, max_retries=4, backoff=1.0, max_pages=None,
+                 empty_retries=2, posts_per_topic=5):
+        self.output_path = output_path
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_pages = max_pages
+        self.empty_retries = min(empty_retries, max_retries)
+        self.posts_per_topic = posts_per_topic
+        self.limiter = RateLimiter(rate)
+        self.count = 0
+
+    async def _fetch_page(self, session, post_id, max_id, max_id_type):
+        """请求一页评论，失败时退避重试，返回接口中的 data 字段"""
+        params = {'id': post_id, 'mid': post_id, 'max_id_type': max_id_type}
+        if max_id:
+            params['max_id'] = max_id
+
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.wait('m.weibo.cn')
+            try:
+                async with session.get(HOTFLOW_URL, params=params) as response:
+                    response.raise_for_status()
+                    payload = await response.json(content_type=None)
+                if payload.get('ok') == 1:
+                    return payload.get('data') or {}
+                # ok != 1 既可能是没有更多评论，也可能是被限流，重试几次后才视为结束
+                if attempt >= self.empty_retries:
+                    return {}
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                if attempt == self.max_retries:
+                    print(f"请求出错: 微博 {post_id} max_id={max_id}: {e}")
+                    return None
+            await asyncio.sleep(self.backoff * 2 ** attempt + random.uniform(0, self.backoff))
+
+    async def _resolve_topic(self, session, topic):
+        """从话题搜索结果页解析微博 mid，失败时退避重试，返回 mid 列表"""
+        url = topic if topic.startswith('http') else TOPIC_URL.format(topic)
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.wait('s.weibo.com')
+            try:
+                async with session.get(url) as response:
+                    response.raise_for_status()
+                    html = await response.text()
+                return extract_post_mids(html, self.posts_per_topic)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.max_retries:
+                    print(f"请求出错: 话题 {topic}: {e}")
+                    return []
+            await asyncio.sleep(self.backoff * 2 ** attempt + random.uniform(0, self.backoff))
+
+    async def _crawl_target(self, session, semaphore, target, writer):
+        """抓取一个微博 mid 或一个热搜话题下若干条微博的热评"""
+        if is_post_id(target):
+            await self._crawl_post(session, semaphore, target, writer)
+            return
+        async with semaphore:
+            mids = await self._resolve_topic(session, target)
+        if not mids:
+            print(f"话题 {target} 没有解析到微博")
+        await asyncio.gather(*(self._crawl_post(session, semaphore, mid, writer, topic=target) for mid in mids))
+
+    async def _crawl_post(self, session, semaphore, post_id, writer, topic=None):
+        """按 max_id 翻页抓取一条微博的全部热评，topic 为其所属的热搜话题ID"""
+        async with semaphore:
+            max_id, max_id_type, pages = 0, 0, 0
+            while True:
+                data = await self._fetch_page(session, post_id, max_id, max_id_type)
+                if not data:
+                    break
+                for comment in data.get('data') or []:
+                    record = parse_comment(comment)
+                    record['微博ID'] = post_id
+                    if topic is not None:
+                        record['话题ID'] = topic
+                    writer.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    self.count += 1
+                writer.flush()
+
+                pages += 1
+                max_id, max_id_type = data.get('max_id', 0), data.get('max_id_type', 0)
+                if not max_id or (self.max_pages and pages >= self.max_pages):
+                    break
+            print(f"微博 {post_id} 抓取完成，共 {pages} 页")
+
+    async def crawl(self, post_ids):
+        """抓取多条微博（mid 或热搜话题ID）的评论，返回写入的评论条数"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency * 2)
+        timeout = aiohttp.ClientTimeout(total=30)
+        with open(self.output_path, 'a', encoding='utf-8') as writer:
+            async with aiohttp.ClientSession(headers=HEADERS, connector=connector, timeout=timeout) as session:
+                await asyncio.gather(*(self._crawl_target(session, semaphore, post_id, writer)
+                                       for post_id in post_ids))
+        return self.count
+
+
+def crawl_comments(post_ids, output_path=None, **kwargs):
+    """同步入口：抓取 post_ids 的全部热评并流式写入 JSON Lines 文件
+
+    默认写入 COMMENTS_DIR，对所有爬出来的文件情感分析-情感分析.py 会扫描该目录。
+    """
+    if output_path is None:
+        os.makedirs(COMMENTS_DIR, exist_ok=True)
+        output_path = os.path.join(COMMENTS_DIR, f"comments_{datetime.now().strftime('%Y%m%d%H%M%S')}.jsonl")
+    count = asyncio.run(CommentCrawler(output_path, **kwargs).crawl(post_ids))
+    print(f"成功保存{count}条评论数据到 {output_path}")
+    return output_path
+
+
+def latest_snapshot_ids(root='weibohot_store'):
+    """读取快照库中最新一次快照的ID列表（热搜话题ID，抓取时再解析为微博 mid）"""
+    from snapshot_store import read_snapshots
+
+    df = read_snapshots(root, columns=['ID', '日期时间'])
+    if df.empty:
+        return []
+    latest = df[df['日期时间'] == df['日期时间'].max()]
+    return [weibo_id for weibo_id in latest['ID'].astype(str) if weibo_id]
+
+
+if __name__ == '__main__':
+    # 命令行传入微博ID；不传时使用快照库中最新一次热搜的ID
+    ids = sys.argv[1:] or latest_snapshot_ids()
+    if ids:
+        crawl_comments(ids)
+    else:
+        print("没有需要抓取的微博ID")
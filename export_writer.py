@@ -0,0 +1,103 @@
+import os
+from itertools import chain, islice
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
+
+# Excel 单个工作表的最大行数（含标题行）
+EXCEL_MAX_ROWS = 1048576
+# 估算列宽时采样的行数
+WIDTH_SAMPLE_ROWS = 1000
+
+FORMATS = {
+    '.xlsx': 'excel',
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+}
+
+
+def estimate_widths(columns, sample_rows):
+    """按标题和样本行中最长的内容估算列宽"""
+    widths = [len(str(column)) for column in columns]
+    for row in sample_rows:
+        for i, value in enumerate(row):
+            if value is not None:
+                widths[i] = max(widths[i], len(str(value)))
+    return [width * 1.2 for width in widths]
+
+
+def _new_sheet(wb, title, columns, widths):
+    ws = wb.create_sheet(title)
+    # 只写模式下列宽必须在写入数据前设置
+    for i, width in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(i)].width = width
+    header = []
+    for column in columns:
+        cell = WriteOnlyCell(ws, value=column)
+        cell.font = Font(bold=True)
+        header.append(cell)
+    ws.append(header)
+    return ws
+
+
+def write_excel(rows, columns, output_path, sheet_name='Sheet1', max_rows=EXCEL_MAX_ROWS):
+    """以只写（流式）模式把行迭代器写入 Excel，返回写入的数据行数
+
+    列宽由前 WIDTH_SAMPLE_ROWS 行估算，不再逐个单元格扫描；超过单表行数上限时
+    自动续写到 “<sheet_name>_2”、“<sheet_name>_3” 等新工作表。
+    """
+    rows = iter(rows)
+    sample = list(islice(rows, WIDTH_SAMPLE_ROWS))
+    widths = estimate_widths(columns, sample)
+
+    wb = Workbook(write_only=True)
+    sheet_index = 1
+    ws = _new_sheet(wb, sheet_name, columns, widths)
+    sheet_rows = 0
+    count = 0
+    for row in chain(sample, rows):
+        if sheet_rows >= max_rows - 1:
+            sheet_index += 1
+            ws = _new_sheet(wb, f'{sheet_name}_{sheet_index}', columns, widths)
+            sheet_rows = 0
+        ws.append(row)
+        sheet_rows += 1
+        count += 1
+    wb.save(output_path)
+    return count
+
+
+def iter_frame_rows(df):
+    """逐行产出 DataFrame 的值，空值转为 None 以便写入 Excel"""
+    for row in df.itertuples(index=False, name=None):
+        yield [None if value is None or value is pd.NA or value != value else value for value in row]
+
+
+def export_format(output_path):
+    """由扩展名判断输出格式，未知扩展名按 Excel 处理"""
+    return FORMATS.get(os.path.splitext(output_path)[1].lower(), 'excel')
+
+
+def arrow_safe(df):
+    """Excel 读出的混合类型列（如排名中的“置顶”）统一转为字符串，便于写入Parquet"""
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+def write_frame(df, output_path, sheet_name='Sheet1'):
+    """按输出文件扩展名写出 DataFrame：.csv 和 .parquet 直接写出，其他写为流式 Excel"""
+    fmt = export_format(output_path)
+    if fmt == 'csv':
+        # 带 BOM，Excel 打开时中文不乱码
+        df.to_csv(output_path, index=False, encoding='utf-8-sig')
+    elif fmt == 'parquet':
+        arrow_safe(df).to_parquet(output_path, index=False)
+    else:
+        write_excel(iter_frame_rows(df), [str(column) for column in df.columns], output_path, sheet_name)
+    return output_path
@@ -0,0 +1,89 @@
+import pandas as pd
+from pandas.api.types import is_numeric_dtype, union_categoricals
+
+# 热搜与评论数据的紧凑列类型；没有出现的列跳过，未列出的列原样保留
+# 'rank'：排名转为可空小整数，置顶/广告另记在“置顶”列
+# 'hot_value'：从热度文本（如“剧集 123456”）中解析出数值
+FRAME_SCHEMA = {
+    '排名': 'rank',
+    '热度值': 'hot_value',
+    '热度类型': 'category',
+    '性别': 'category',
+    'svip': 'Int8',
+    '地区': 'category',
+}
+
+PINNED_COLUMN = '置顶'
+
+
+def memory_usage(df):
+    """DataFrame 实际占用的字节数（包括字符串对象本身）"""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def memory_report(before, df):
+    """转换前后的内存对比"""
+    after = memory_usage(df)
+    ratio = before / after if after else 0
+    return f'内存占用: {before / 1024 ** 2:.2f} MB -> {after / 1024 ** 2:.2f} MB ({ratio:.1f}x)'
+
+
+def parse_rank_column(series):
+    """排名列转为 Int16，返回 (排名, 置顶标记)；有值但不是数字的视为置顶/广告"""
+    ranks = pd.to_numeric(series, errors='coerce')
+    pinned = series.notna() & ranks.isna()
+    return ranks.round().astype('Int16'), pinned
+
+
+def parse_hot_value_column(series):
+    """热度文本中的第一个数字转为 Int64，没有数字时为空"""
+    if is_numeric_dtype(series):
+        return series.astype('Int64')
+    digits = series.astype('string').str.replace(',', '', regex=False).str.extract(r'(\d+)', expand=False)
+    return pd.to_numeric(digits, errors='coerce').astype('Int64')
+
+
+def compact_frame(df, schema=None):
+    """按 schema 把列转换为紧凑类型，返回新的 DataFrame
+
+    重复出现的字符串转为 category，小整数转为可空小整数，热度值解析为数值；
+    排名中的“置顶”等非数字值记在单独的“置顶”布尔列中。
+    """
+    schema = FRAME_SCHEMA if schema is None else schema
+    columns = {}
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            continue
+        if dtype == 'rank':
+            columns[col], pinned = parse_rank_column(df[col])
+            if PINNED_COLUMN not in df.columns:
+                columns[PINNED_COLUMN] = pinned
+        elif dtype == 'hot_value':
+            columns[col] = parse_hot_value_column(df[col])
+        elif dtype == 'category':
+            columns[col] = df[col].astype('category')
+        else:
+            columns[col] = pd.to_numeric(df[col], errors='coerce').astype(dtype)
+    if not columns:
+        return df
+
+    df = df.assign(**columns)
+    if PINNED_COLUMN in columns:
+        # 置顶标记紧跟在排名后面
+        order = [col for col in df.columns if col != PINNED_COLUMN]
+        order.insert(order.index('排名') + 1, PINNED_COLUMN)
+        df = df[order]
+    return df
+
+
+def concat_frames(dfs):
+    """合并多个紧凑 DataFrame，同名 category 列先统一类别，避免退化为 object"""
+    dfs = [df for df in dfs if not df.empty]
+    if len(dfs) <= 1:
+        return dfs[0].copy() if dfs else pd.DataFrame()
+    for col in dfs[0].columns:
+        if not all(col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype) for df in dfs):
+            continue
+        categories = union_categoricals([df[col] for df in dfs]).categories
+        dfs = [df.assign(**{col: df[col].cat.set_categories(categories)}) for df in dfs]
+    return pd.concat(dfs, ignore_index=True)
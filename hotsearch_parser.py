@@ -0,0 +1,176 @@
+import os
+import re
+from datetime import datetime
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+# 热搜榜所在的容器，lxml 解析时只截取这一段
+CONTAINER_ID = 'pl_top_realtimehot'
+MAX_ITEMS = 51  # 前50个热搜+置顶
+
+
+def extract_weibo_id(url):
+    """从微博URL中提取ID"""
+    if not url:
+        print('该微博没有URL,跳过')
+        return ''
+
+    # 尝试从多种URL格式中提取ID
+    patterns = [
+        r'weibo\.com/(\d+)/\w+',
+        r'weibo\.com/\w+/(\w+)',
+        r'status/(\w+)',
+        r'/(\w{9})(?:\?|$)',
+        r'q=([a-zA-Z0-9%]+)',
+        r'topic/(\d+)'
+    ]
+
+    for pattern in patterns:
+        match = re.search(pattern, url)
+        if match:
+            return match.group(1)
+    return ''
+
+
+def _build_record(current_time, rank, title, href, hot_value, hot_type):
+    """由各字段构建一条热搜记录，两种解析后端共用"""
+    full_url = f"https://s.weibo.com{href}" if href.startswith('/') else href
+    return {
+        '日期时间': current_time,
+        '排名': rank,
+        '标题': title,
+        '热度值': hot_value,
+        '热度类型': hot_type,
+        '链接': full_url,
+        'ID': extract_weibo_id(full_url)
+    }
+
+
+def _parse_bs4(html, current_time):
+    """BeautifulSoup 解析（原实现）"""
+    soup = BeautifulSoup(html, 'html.parser')
+    hot_data = []
+
+    # 获取热搜列表（包括置顶的广告）
+    hot_items = soup.select(f'#{CONTAINER_ID} > table > tbody > tr')[:MAX_ITEMS]
+
+    for item in hot_items:
+        try:
+            # 排名
+            rank_elem = item.select_one('td.ranktop')
+            rank = rank_elem.text.strip() if rank_elem else '置顶'
+
+            # 标题和链接
+            title_elem = item.select_one('td.td-02 a')
+            title = title_elem.text.strip() if title_elem else '未知'
+            href = title_elem.get('href') if title_elem else ''
+
+            # 热度值
+            hot_value_elem = item.select_one('td.td-02 span')
+            hot_value = hot_value_elem.text.strip() if hot_value_elem else '未知'
+
+            # 热度类型（如：沸、热、新等）
+            hot_type_elem = item.select_one('td.td-03 i')
+            hot_type = hot_type_elem.text.strip() if hot_type_elem else ''
+
+            hot_data.append(_build_record(current_time, rank, title, href, hot_value, hot_type))
+
+        except Exception as e:
+            print(f"解析单个热搜项时出错: {e}")
+            continue
+
+    return hot_data
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# 与 _parse_bs4 中各 CSS 选择器等价的 XPath
+_XPATH_ROWS = f'//*[@id="{CONTAINER_ID}"]/table/tbody/tr'
+_XPATH_RANK = f'.//td[{_has_class("ranktop")}]'
+_XPATH_TITLE = f'.//td[{_has_class("td-02")}]//a'
+_XPATH_HOT_VALUE = f'.//td[{_has_class("td-02")}]//span'
+_XPATH_HOT_TYPE = f'.//td[{_has_class("td-03")}]//i'
+
+
+def _first_text(item, xpath, default):
+    elems = item.xpath(xpath)
+    return elems[0].text_content().strip() if elems else default
+
+
+def _parse_lxml(html, current_time):
+    """lxml 快速解析：只解析热搜容器所在的片段，用预编译的 XPath 取字段"""
+    start = html.find(f'id="{CONTAINER_ID}"')
+    if start < 0:
+        return []
+    # 截取容器开始标签之后的内容，页面头部和其他模块不参与解析
+    fragment = html[html.rfind('<', 0, start):]
+    root = lxml.html.document_fromstring(fragment)
+    hot_data = []
+
+    for item in root.xpath(_XPATH_ROWS)[:MAX_ITEMS]:
+        try:
+            rank = _first_text(item, _XPATH_RANK, '置顶')
+
+            title_elems = item.xpath(_XPATH_TITLE)
+            title_elem = title_elems[0] if title_elems else None
+            title = title_elem.text_content().strip() if title_elem is not None else '未知'
+            href = title_elem.get('href') if title_elem is not None else ''
+
+            hot_value = _first_text(item, _XPATH_HOT_VALUE, '未知')
+            hot_type = _first_text(item, _XPATH_HOT_TYPE, '')
+
+            hot_data.append(_build_record(current_time, rank, title, href, hot_value, hot_type))
+
+        except Exception as e:
+            print(f"解析单个热搜项时出错: {e}")
+            continue
+
+    return hot_data
+
+
+def parse_hot_page(html, current_time, backend='auto'):
+    """解析热搜页面，返回热搜数据列表
+
+    backend 可选 'lxml'、'bs4' 或 'auto'（安装了 lxml 时用 lxml），
+    两种后端产出的记录完全相同。
+    """
+    if backend == 'auto':
+        backend = 'lxml' if lxml is not None else 'bs4'
+    if backend == 'lxml':
+        return _parse_lxml(html, current_time)
+    return _parse_bs4(html, current_time)
+
+
+def snapshot_time_from_path(file_path):
+    """从文件名中的 YYYYMMDDHHMM(SS) 取快照时间，没有时使用文件修改时间"""
+    match = re.search(r'(\d{14}|\d{12})', os.path.basename(file_path))
+    if match:
+        return match.group(1)[:12]
+    return datetime.fromtimestamp(os.path.getmtime(file_path)).strftime("%Y%m%d%H%M")
+
+
+def list_saved_pages(paths):
+    """展开文件和目录参数，返回所有已保存的 .html/.htm 页面"""
+    pages = []
+    for path in paths:
+        if os.path.isdir(path):
+            pages.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                         if name.endswith(('.html', '.htm')))
+        else:
+            pages.append(path)
+    return pages
+
+
+def parse_saved_pages(paths, backend='auto'):
+    """离线解析已保存的热搜页面，逐个产出 (文件路径, 热搜数据列表)"""
+    for file_path in list_saved_pages(paths):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            html = f.read()
+        yield file_path, parse_hot_page(html, snapshot_time_from_path(file_path), backend)
@@ -0,0 +1,141 @@
+import os
+import re
+
+import pandas as pd
+
+# 原始列名（小写）到标准列名的映射
+COLUMN_MAPPING = {
+    'title': '标题',
+    'content': '标题',
+    'name': '标题',
+    '热搜': '标题',
+    '话题': '标题',
+    'rank': '排名',
+    'hot': '热度值',
+    'score': '热度值',
+    'type': '热度类型',
+    'category': '热度类型'
+}
+
+# 文件头的魔数
+MAGIC_BYTES = [
+    (b'PAR1', 'parquet'),
+    (b'PK\x03\x04', 'excel'),  # xlsx 为 zip 包
+    (b'\xd0\xcf\x11\xe0', 'excel'),  # xls 为 OLE2 复合文档
+]
+
+EXTENSIONS = {
+    '.csv': 'csv',
+    '.tsv': 'csv',
+    '.txt': 'txt',
+    '.parquet': 'parquet',
+    '.xlsx': 'excel',
+    '.xls': 'excel',
+}
+
+TXT_COLUMNS = ['排名', '标题', '热度值', '热度类型']
+_TXT_SPLIT_RE = re.compile(r'[,|\t]')
+
+
+def sniff_format(file_path):
+    """根据文件头魔数和扩展名判断格式，返回 'csv'、'txt'、'excel' 或 'parquet'
+
+    二进制格式只看魔数；文本文件先看扩展名，没有可识别的扩展名时，
+    首行以数字开头、且至少能分出排名/标题/热度三段的视为无表头的 TXT。
+    """
+    with open(file_path, 'rb') as f:
+        head = f.read(4096)
+    for magic, fmt in MAGIC_BYTES:
+        if head.startswith(magic):
+            return fmt
+
+    fmt = EXTENSIONS.get(os.path.splitext(file_path)[1].lower())
+    if fmt in ('csv', 'txt'):
+        return fmt
+
+    first_line = head.decode('utf-8', errors='ignore').lstrip('\ufeff').split('\n', 1)[0].strip()
+    parts = _TXT_SPLIT_RE.split(first_line)
+    if len(parts) >= 3 and parts[0].strip().isdigit():
+        return 'txt'
+    return 'csv'
+
+
+def column_renames(columns, dtypes=None):
+    """计算标准化列名的映射；没有标题列时取第一个文本列作为标题"""
+    renames = {col: COLUMN_MAPPING.get(str(col).lower(), col) for col in columns}
+    if '标题' not in renames.values() and dtypes is not None:
+        for col in columns:
+            if dtypes[col] == 'object' or pd.api.types.is_string_dtype(dtypes[col]):
+                renames[col] = '标题'
+                break
+    return renames
+
+
+def _map_columns(chunks):
+    """列名映射只在第一块上计算一次，之后每块直接重命名"""
+    renames = None
+    for chunk in chunks:
+        if renames is None:
+            renames = column_renames(chunk.columns, chunk.dtypes)
+            if '标题' not in renames.values():
+                raise ValueError("无法识别标题列，请检查数据格式")
+        yield chunk.rename(columns=renames)
+
+
+def _iter_csv(file_path, chunksize):
+    sep = '\t' if file_path.lower().endswith('.tsv') else ','
+    yield from pd.read_csv(file_path, encoding='utf-8', sep=sep, on_bad_lines='warn', chunksize=chunksize)
+
+
+def _iter_txt(file_path, chunksize):
+    """逐行解析 TXT：每行按逗号、竖线或制表符分隔，至少有排名、标题、热度"""
+    rows = []
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            parts = _TXT_SPLIT_RE.split(line)
+            if len(parts) >= 3:
+                rows.append((parts[0], parts[1], parts[2], parts[3] if len(parts) > 3 else ''))
+            if len(rows) >= chunksize:
+                yield pd.DataFrame(rows, columns=TXT_COLUMNS)
+                rows = []
+    if rows:
+        yield pd.DataFrame(rows, columns=TXT_COLUMNS)
+
+
+def _iter_parquet(file_path, chunksize):
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(file_path)
+    for batch in parquet_file.iter_batches(batch_size=chunksize):
+        yield batch.to_pandas()
+
+
+def _iter_excel(file_path, chunksize):
+    # Excel 不支持分块读取，整表读入后按块切分
+    df = pd.read_excel(file_path)
+    for start in range(0, max(len(df), 1), chunksize):
+        yield df.iloc[start:start + chunksize]
+
+
+READERS = {
+    'csv': _iter_csv,
+    'txt': _iter_txt,
+    'parquet': _iter_parquet,
+    'excel': _iter_excel,
+}
+
+
+def iter_hotsearch_chunks(file_path, chunksize=100000, fmt=None):
+    """按块读取热搜数据，逐块产出已统一列名的 DataFrame
+
+    格式由 sniff_format 预先判断，每种格式只读一次；CSV、TXT 和 Parquet
+    真正分块读取，下游可以边读边处理。
+    """
+    fmt = fmt or sniff_format(file_path)
+    chunks = READERS[fmt](file_path, chunksize)
+    if fmt == 'txt':
+        return chunks
+    return _map_columns(chunks)
@@ -0,0 +1,42 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def atomic_write(path, write, tmp_path=None):
+    """先调用 write(临时路径) 写入临时文件再替换 path，中断时不会留下写了一半的文件
+
+    tmp_path 默认为 path 加 .tmp 后缀；写入失败时删除临时文件并重新抛出异常。
+    """
+    tmp_path = path + '.tmp' if tmp_path is None else tmp_path
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+def atomic_json(path, obj, **kwargs):
+    """把 obj 写为 JSON（中文不转义），先写临时文件再替换；kwargs 传给 json.dump"""
+    def write(tmp_path):
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(obj, f, ensure_ascii=False, **kwargs)
+    return atomic_write(path, write)
+
+
+def pool_map(func, items, workers=None):
+    """按输入顺序返回 func 对每一项的结果列表
+
+    func 必须是模块级函数，以便传给子进程。只有一项或 workers<=1 时串行，
+    否则用最多 workers 个进程的进程池。
+    """
+    items = list(items)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(items) <= 1:
+        return list(map(func, items))
+    with ProcessPoolExecutor(max_workers=min(workers, len(items))) as executor:
+        return list(executor.map(func, items))
@@ -0,0 +1,160 @@
+import os
+from collections import deque
+
+import pandas as pd
+
+try:
+    import ahocorasick  # pyahocorasick，可选的C实现
+except ImportError:
+    ahocorasick = None
+
+# 内置词典，权重默认为1，可通过词典文件覆盖
+NEGATIVE_WORDS = dict.fromkeys([
+    '不', '没有', '未', '无', '拒绝', '反对', '抗议', '谴责', '批评', '指责',
+    '失望', '愤怒', '伤心', '难过', '痛苦', '悲剧', '灾难', '死亡', '事故', '失败',
+    '问题', '困难', '挑战', '危机', '冲突', '战争', '暴力', '犯罪', '诈骗', '欺骗'
+], 1.0)
+
+POSITIVE_WORDS = dict.fromkeys([
+    '好', '优秀', '成功', '胜利', '开心', '快乐', '幸福', '喜悦', '满意', '赞成',
+    '支持', '庆祝', '成就', '进步', '发展', '创新', '突破', '冠军', '奖励', '荣誉',
+    '爱', '喜欢', '感谢', '感激', '美好', '漂亮', '精彩', '完美', '强大'
+], 1.0)
+
+
+def load_lexicon(path):
+    """读取词典文件，每行“词语”或“词语<Tab>权重”，#开头为注释"""
+    words = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            parts = line.split('\t')
+            words[parts[0]] = float(parts[1]) if len(parts) > 1 and parts[1] else 1.0
+    return words
+
+
+class LexiconMatcher:
+    """多词典单遍匹配器（Aho-Corasick自动机）
+
+    lexicons 形如 {'negative': {词: 权重}, 'positive': {词: 权重}}，所有词典
+    编译进同一个自动机，每条文本只扫描一遍即可得到各词典的全部命中。
+    安装了 pyahocorasick 时使用其C实现，否则使用纯Python实现，结果相同。
+    """
+
+    def __init__(self, lexicons):
+        self.labels = list(lexicons)
+        entries = [(word, label, weight)
+                   for label, words in lexicons.items()
+                   for word, weight in words.items() if word]
+
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            merged = {}
+            for word, label, weight in entries:
+                merged.setdefault(word, []).append((label, weight))
+            for word, outputs in merged.items():
+                self._automaton.add_word(word, (word, outputs))
+            if merged:
+                self._automaton.make_automaton()
+            else:
+                self._automaton = None
+        else:
+            self._build(entries)
+
+    def _build(self, entries):
+        """构建纯Python自动机：goto表、失败指针和输出表"""
+        self._automaton = None
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for word, label, weight in entries:
+            node = 0
+            for char in word:
+                nxt = self._goto[node].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append((word, label, weight))
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def iter_matches(self, text):
+        """逐个产出命中 (结束位置, 词语, 词典名, 权重)，允许重叠"""
+        if not text:
+            return
+        if ahocorasick is not None:
+            if self._automaton is None:
+                return
+            for end, (word, outputs) in self._automaton.iter(text):
+                for label, weight in outputs:
+                    yield end, word, label, weight
+            return
+
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for word, label, weight in out[node]:
+                yield i, word, label, weight
+
+    def weigh(self, text):
+        """返回各词典命中权重之和 {词典名: 权重}"""
+        totals = dict.fromkeys(self.labels, 0.0)
+        for _, _, label, weight in self.iter_matches(text):
+            totals[label] += weight
+        return totals
+
+    def match_series(self, series):
+        """批量匹配，返回与 series 同索引、每个词典一列权重和的 DataFrame"""
+        rows = [self.weigh(text) if isinstance(text, str) else dict.fromkeys(self.labels, 0.0)
+                for text in series]
+        return pd.DataFrame(rows, index=series.index, columns=self.labels)
+
+
+_matcher = None
+
+
+def get_matcher():
+    """获取默认的正负面词典匹配器
+
+    环境变量 WEIBO_NEGATIVE_LEXICON / WEIBO_POSITIVE_LEXICON 指向词典文件时
+    使用文件内容，否则使用内置词典。
+    """
+    global _matcher
+    if _matcher is None:
+        negative_path = os.environ.get('WEIBO_NEGATIVE_LEXICON')
+        positive_path = os.environ.get('WEIBO_POSITIVE_LEXICON')
+        _matcher = LexiconMatcher({
+            'negative': load_lexicon(negative_path) if negative_path else NEGATIVE_WORDS,
+            'positive': load_lexicon(positive_path) if positive_path else POSITIVE_WORDS,
+        })
+    return _matcher
+
+
+def configure_lexicon(negative_path=None, positive_path=None):
+    """指定词典文件并重建默认匹配器，配置写入环境变量以便子进程沿用"""
+    global _matcher
+    for key, path in (('WEIBO_NEGATIVE_LEXICON', negative_path), ('WEIBO_POSITIVE_LEXICON', positive_path)):
+        if path:
+            os.environ[key] = path
+        else:
+            os.environ.pop(key, None)
+    _matcher = None
+    return get_matcher()
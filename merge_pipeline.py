@@ -0,0 +1,390 @@
+import hashlib
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+try:
+    import python_calamine  # noqa: F401  Rust实现的Excel读取器，pandas>=2.2 可用 engine='calamine'
+    EXCEL_ENGINE = 'calamine'
+except ImportError:
+    EXCEL_ENGINE = None  # pandas 默认的 openpyxl（只读模式）
+
+from weibohot_analysis import score_texts, scoring_pool, raw_sentiment_score
+from sentiment_cache import get_cache
+from token_store import get_token_store
+from frame_schema import compact_frame
+from export_writer import arrow_safe, export_format, iter_frame_rows, write_excel
+from near_dedup import near_duplicate_labels, dedup_report
+from io_utils import atomic_json
+
+EXCEL_EXTENSIONS = ('.xlsx', '.xls')
+# comment_crawler 输出的 JSON Lines 评论文件
+JSONL_EXTENSIONS = ('.jsonl',)
+# comment_crawler 默认的输出目录，评论合并脚本除当前目录外也扫描这里
+COMMENTS_DIR = 'weibo_comments'
+
+
+def file_hash(file_path, block_size=1 << 20):
+    """分块计算文件内容的SHA1"""
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def list_workbooks(file_dir, exclude=(), extra_dirs=()):
+    """列出目录下的 Excel 文件（支持.xlsx 和.xls 格式）和 .jsonl 评论文件，exclude 中的绝对路径除外
+
+    extra_dirs 中的目录（如 COMMENTS_DIR）一并列出，不存在时跳过；都不扫描子目录。
+    """
+    exclude = {os.path.abspath(path) for path in exclude}
+    paths = []
+    for directory in [file_dir] + [d for d in extra_dirs if os.path.isdir(d)]:
+        for file_name in sorted(os.listdir(directory)):
+            file_path = os.path.abspath(os.path.join(directory, file_name))
+            if file_name.endswith(EXCEL_EXTENSIONS + JSONL_EXTENSIONS) and file_path not in exclude:
+                paths.append(file_path)
+    return paths
+
+
+# 不同来源文件中同义列名的统一写法（按小写、去空格后匹配）
+COLUMN_ALIASES = {
+    'id': 'ID',
+    'title': '标题',
+    '热搜': '标题',
+    '话题': '标题',
+    '热搜标题': '标题',
+    'rank': '排名',
+    'hot': '热度值',
+    '热度': '热度值',
+    'type': '热度类型',
+    'url': '链接',
+    'link': '链接',
+    'time': '日期时间',
+    'comment': '评论',
+    'comments': '评论',
+    'text': '评论',
+    '评论内容': '评论',
+    '评价': '评论',
+    'user': '用户',
+    '用户名': '用户',
+    'gender': '性别',
+    'region': '地区',
+    'date': '日期',
+}
+
+# 合并结果的统一列类型，未列出的列原样保留
+MERGED_SCHEMA = {
+    'ID': 'string',
+    '日期时间': 'string',
+    '排名': 'string',
+    '标题': 'string',
+    '热度值': 'string',
+    '热度类型': 'string',
+    '链接': 'string',
+    '用户': 'string',
+    '性别': 'string',
+    'svip': 'Int8',
+    '地区': 'string',
+    '评论': 'string',
+    '日期': 'string',
+}
+
+
+def align_columns(df):
+    """把同义列名统一为标准列名，并按 MERGED_SCHEMA 转换列类型"""
+    df = df.rename(columns=lambda col: COLUMN_ALIASES.get(str(col).strip().lower(), str(col).strip()))
+    # 改名后可能出现重复列，保留第一个
+    df = df.loc[:, ~df.columns.duplicated()]
+    for col, dtype in MERGED_SCHEMA.items():
+        if col not in df.columns:
+            continue
+        try:
+            if dtype == 'string':
+                df[col] = df[col].astype('string')
+            else:
+                df[col] = pd.to_numeric(df[col], errors='coerce').astype(dtype)
+        except (TypeError, ValueError) as e:
+            print(f"列 {col} 无法转换为 {dtype}: {e}")
+    return df
+
+
+def read_workbook(file_path, engine=EXCEL_ENGINE):
+    """读取一个 Excel 文件的所有工作表（.jsonl 文件视为一个工作表），并统一列名和类型"""
+    if file_path.endswith(JSONL_EXTENSIONS):
+        return [align_columns(pd.read_json(file_path, lines=True, dtype=False))]
+    excel_file = pd.ExcelFile(file_path, engine=engine)
+    return [align_columns(excel_file.parse(sheet_name)) for sheet_name in excel_file.sheet_names]
+
+
+def _read_workbook_safe(file_path):
+    """子进程读取，出错时返回错误信息而不是抛出"""
+    try:
+        return read_workbook(file_path), None
+    except Exception as e:
+        return None, str(e)
+
+
+def ingest_workbooks(paths, workers=None):
+    """用进程池并行读取多个 Excel 文件，按输入顺序逐个产出 (路径, 工作表列表)
+
+    同时在途的文件不超过 workers * 2 个，已读完但还没被消费的工作表不会随文件数
+    累积。读取失败的文件打印错误后跳过。只有一个文件或 workers<=1 时串行读取。
+    """
+    paths = list(paths)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers <= 1 or len(paths) <= 1:
+        results = map(_read_workbook_safe, paths)
+        for file_path, (dfs, error) in zip(paths, results):
+            if error is not None:
+                print(f'读取文件 {os.path.basename(file_path)} 时出现错误: {error}')
+                continue
+            yield file_path, dfs
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as executor:
+        pending = deque()
+        remaining = iter(paths)
+        for file_path in remaining:
+            pending.append((file_path, executor.submit(_read_workbook_safe, file_path)))
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            file_path, future = pending.popleft()
+            dfs, error = future.result()
+            # 取走一个结果再提交下一个文件
+            next_path = next(remaining, None)
+            if next_path is not None:
+                pending.append((next_path, executor.submit(_read_workbook_safe, next_path)))
+            if error is not None:
+                print(f'读取文件 {os.path.basename(file_path)} 时出现错误: {error}')
+                continue
+            yield file_path, dfs
+
+
+def split_sources(df, sources):
+    """按 (来源路径, 行数) 列表把合并后的数据切回各来源，逐个产出 (路径, 切片)"""
+    start = 0
+    for file_path, rows in sources:
+        yield file_path, df.iloc[start:start + rows]
+        start += rows
+
+
+def score_frame(df, text_column, workers=None, chunk_size=1000, dedup=False, executor=None):
+    """对指定文本列打分，结果写入“情感得分”列；传入 executor 时复用该打分进程池
+
+    dedup 为真时先做近似去重，每个簇只给代表文本打分，得分复制给簇内所有
+    文本，“重复数”列记录所在簇的大小，可作为统计时的权重。
+    """
+    if text_column not in df.columns:
+        print(f"数据中不存在'{text_column}'列，无法进行情感分析。")
+        return df
+    if not dedup:
+        df['情感得分'] = score_texts(df[text_column], raw_sentiment_score, workers=workers, chunk_size=chunk_size,
+                                    executor=executor)
+        return df
+
+    labels = near_duplicate_labels(df[text_column])
+    representatives = np.unique(labels)
+    scores = score_texts(df[text_column].iloc[representatives], raw_sentiment_score,
+                         workers=workers, chunk_size=chunk_size, executor=executor)
+    df['情感得分'] = scores.to_numpy()[np.searchsorted(representatives, labels)]
+    df['重复数'] = np.bincount(labels, minlength=len(df))[labels]
+    print(dedup_report(labels))
+    return df
+
+
+class MergeManifest:
+    """已处理文件清单：记录每个文件的路径、大小、修改时间、内容哈希和对应分片"""
+
+    def __init__(self, path):
+        self.path = path
+        self.files = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.files = json.load(f)
+
+    def check(self, file_path):
+        """判断文件是否未变化，返回 (是否未变化, 内容哈希)
+
+        大小和修改时间都一致时直接视为未变化；否则计算哈希，内容相同的
+        只更新记录中的大小和修改时间。
+        """
+        stat = os.stat(file_path)
+        entry = self.files.get(file_path)
+        if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns:
+            return True, entry['sha1']
+
+        digest = file_hash(file_path)
+        if entry and entry['sha1'] == digest:
+            entry['size'], entry['mtime'] = stat.st_size, stat.st_mtime_ns
+            return True, digest
+        return False, digest
+
+    def record(self, file_path, part, rows, digest):
+        stat = os.stat(file_path)
+        self.files[file_path] = {
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+            'sha1': digest,
+            'part': part,
+            'rows': rows,
+        }
+
+    def forget(self, file_path):
+        return self.files.pop(file_path, None)
+
+    def save(self):
+        """先写临时文件再替换，避免中断时清单损坏"""
+        atomic_json(self.path, self.files, indent=2)
+
+
+def store_dir_for(output_file_path):
+    """合并结果的分片目录，与输出文件同名加 _store 后缀"""
+    return os.path.splitext(output_file_path)[0] + '_store'
+
+
+def store_parts(store_dir):
+    """按清单顺序列出所有分片的路径"""
+    manifest = MergeManifest(os.path.join(store_dir, 'manifest.json'))
+    return [os.path.join(store_dir, entry['part']) for _, entry in sorted(manifest.files.items())]
+
+
+def _plain_type(field):
+    """字典编码列（category）按原值类型写出，各分片的列类型才能统一"""
+    return field.type.value_type if pa.types.is_dictionary(field.type) else field.type
+
+
+def export_store(store_dir, output_path, sheet_name='Sheet1'):
+    """逐个分片导出合并结果，内存中同时只有一个分片；格式同 write_frame 按扩展名判断
+
+    各分片的列取并集（按首次出现的顺序），分片中没有的列写为空值。
+    """
+    parts = store_parts(store_dir)
+    schemas = [pq.read_schema(part) for part in parts]
+    columns = list(dict.fromkeys(name for schema in schemas for name in schema.names))
+    fmt = export_format(output_path)
+    if fmt == 'parquet':
+        schema = pa.unify_schemas([pa.schema([(field.name, _plain_type(field)) for field in schema])
+                                   for schema in schemas], promote_options='permissive')
+        schema = pa.schema([schema.field(name) for name in columns])
+        with pq.ParquetWriter(output_path, schema) as writer:
+            for part in parts:
+                table = pq.read_table(part)
+                writer.write_table(pa.table({name: table.column(name).cast(schema.field(name).type)
+                                             if name in table.column_names
+                                             else pa.nulls(len(table), schema.field(name).type)
+                                             for name in columns}, schema=schema))
+    elif fmt == 'csv':
+        for i, part in enumerate(parts):
+            # 带 BOM，Excel 打开时中文不乱码
+            pd.read_parquet(part).reindex(columns=columns).to_csv(
+                output_path, index=False, mode='w' if i == 0 else 'a', header=i == 0,
+                encoding='utf-8-sig' if i == 0 else 'utf-8')
+    else:
+        rows = (row for part in parts for row in iter_frame_rows(pd.read_parquet(part).reindex(columns=columns)))
+        write_excel(rows, [str(column) for column in columns], output_path, sheet_name)
+    return output_path
+
+
+def merge_incremental(file_dir, text_column, output_file_path, workers=None, chunk_size=1000, export_excel=False,
+                      dedup=False, cube=None, text_index=None, extra_dirs=()):
+    """增量合并：只解析和打分新增或内容变化的 Excel 文件
+
+    每个源文件的打分结果单独保存为一个 Parquet 分片，清单记录文件状态；
+    变化的文件覆盖自己的分片，已删除的文件移除对应分片。可视化脚本直接读取
+    分片目录；export_excel 为真时再把全部分片逐个导出为 output_file_path，按
+    扩展名写为流式 Excel、CSV 或 Parquet。dedup 为真时每个文件内先做近似去重再打分。
+    传入 cube（analytics_cube.CubeStore）时同步更新每个文件的预聚合分片，
+    传入 text_index（text_index.TextIndex）时同步更新每个文件的全文索引。
+    extra_dirs 为 file_dir 之外还要扫描的目录，见 list_workbooks。
+    """
+    store_dir = store_dir_for(output_file_path)
+    os.makedirs(store_dir, exist_ok=True)
+    manifest = MergeManifest(os.path.join(store_dir, 'manifest.json'))
+
+    seen = set()
+    changed = {}
+    for file_path in list_workbooks(file_dir, exclude=[output_file_path], extra_dirs=extra_dirs):
+        seen.add(file_path)
+        unchanged, digest = manifest.check(file_path)
+        if not unchanged:
+            changed[file_path] = digest
+
+    # 变化的文件并行读取，读完一个打分一个；所有文件共用一个打分进程池
+    updated = 0
+    with scoring_pool(workers) as executor:
+        for file_path, dfs in ingest_workbooks(changed, workers):
+            if not dfs:
+                continue
+            digest = changed[file_path]
+
+            df = compact_frame(pd.concat(dfs, ignore_index=True))
+            df = score_frame(df, text_column, workers, chunk_size, dedup, executor)
+            part = hashlib.md5(file_path.encode('utf-8')).hexdigest() + '.parquet'
+            arrow_safe(df).to_parquet(os.path.join(store_dir, part), index=False)
+            manifest.record(file_path, part, len(df), digest)
+            if cube is not None:
+                cube.update(file_path, df)
+            if text_index is not None:
+                text_index.add_frame(file_path, df, text_column=text_column)
+            updated += 1
+
+    # 源文件已删除的，移除对应分片
+    for file_path in set(manifest.files) - seen:
+        entry = manifest.forget(file_path)
+        part_path = os.path.join(store_dir, entry['part'])
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        if cube is not None:
+            cube.remove(file_path)
+        if text_index is not None:
+            text_index.remove(file_path)
+        updated += 1
+
+    manifest.save()
+    total_rows = sum(entry['rows'] for entry in manifest.files.values())
+    print(f'本次新增、更新或移除 {updated} 个文件，合并结果共 {total_rows} 行')
+
+    if export_excel and (updated or not os.path.exists(output_file_path)):
+        export_store(store_dir, output_file_path)
+
+    if cube is not None:
+        # 不在清单中的来源（如全量模式留下的、已删除的文件）先移除，
+        # 再把立方体中还没有的文件（如首次启用立方体）从已有分片补录
+        stale = [source for source in cube.sources if source not in manifest.files]
+        for source in stale:
+            cube.remove(source)
+        missing = [file_path for file_path in manifest.files if file_path not in cube.sources]
+        for file_path in missing:
+            cube.update(file_path, pd.read_parquet(os.path.join(store_dir, manifest.files[file_path]['part'])))
+        if updated or missing or stale:
+            cube.save()
+            print(cube.report())
+
+    if text_index is not None:
+        stale = [source for source in text_index.meta['sources'] if source not in manifest.files]
+        for source in stale:
+            text_index.remove(source)
+        missing = [file_path for file_path in manifest.files if file_path not in text_index.meta['sources']]
+        for file_path in missing:
+            text_index.add_frame(file_path, pd.read_parquet(os.path.join(store_dir, manifest.files[file_path]['part'])),
+                                 text_column=text_column)
+        if updated or missing or stale:
+            text_index.save()
+            print(text_index.report())
+
+    get_cache().flush()
+    print(get_cache().report())
+    # 子进程写下的分词分片在这里统一合并
+    get_token_store().flush()
+    get_token_store().compact()
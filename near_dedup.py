@@ -0,0 +1,112 @@
+import zlib
+
+import numpy as np
+
+# MinHash 签名长度，以及 LSH 分段：BANDS 段 × (NUM_PERM / BANDS) 行，
+# 相似度约 (1 / BANDS) ** (BANDS / NUM_PERM) 以上的文本才会落入同一个桶
+NUM_PERM = 64
+BANDS = 8
+SHINGLE_SIZE = 3
+# 一次计算签名的文档数，限制中间矩阵的内存
+SIGNATURE_BLOCK = 2000
+
+
+def shingles(text, k=SHINGLE_SIZE):
+    """去掉空白后取字符 k-gram 集合；短于 k 的文本整体作为一个 shingle"""
+    text = ''.join(text.split())
+    if len(text) <= k:
+        return {text} if text else set()
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+class MinHasher:
+    """MinHash 签名：shingle 先用 crc32 映射为 32 位整数，再做 num_perm 次乘移哈希"""
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = np.random.default_rng(seed)
+        # 乘移哈希要求乘数为奇数
+        self.a = rng.integers(1, 1 << 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+
+    def signatures(self, texts, k=SHINGLE_SIZE):
+        """批量计算签名，返回 (文本数, num_perm) 的 uint32 矩阵"""
+        result = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+        for start in range(0, len(texts), SIGNATURE_BLOCK):
+            block = texts[start:start + SIGNATURE_BLOCK]
+            hashed = [[zlib.crc32(s.encode('utf-8')) for s in shingles(text, k)] or [0] for text in block]
+            lengths = np.fromiter(map(len, hashed), dtype=np.int64, count=len(hashed))
+            values = np.fromiter((h for hashes in hashed for h in hashes), dtype=np.uint64, count=int(lengths.sum()))
+            # 所有 shingle 一起做哈希，再按文本分段取最小值
+            permuted = ((values[:, None] * self.a + self.b) >> np.uint64(32)).astype(np.uint32)
+            offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            result[start:start + len(block)] = np.minimum.reduceat(permuted, offsets, axis=0)
+        return result
+
+
+class _UnionFind:
+    def __init__(self, size):
+        self.parent = np.arange(size)
+
+    def find(self, i):
+        parent = self.parent
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return root
+
+    def union(self, i, j):
+        """合并两个集合，以较小的下标（先出现的文本）为根"""
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+def near_duplicate_labels(texts, threshold=0.8, num_perm=NUM_PERM, bands=BANDS, k=SHINGLE_SIZE):
+    """近似重复聚类，返回每条文本所属簇的代表下标（簇内第一条）
+
+    完全相同的文本直接归为一簇；其余文本计算 MinHash 签名，按 LSH 分段
+    分桶，只和同桶中的第一条比较，估计的 Jaccard 相似度不低于 threshold
+    时合并。非字符串值各自成簇。复杂度与文本数近似线性。
+    """
+    texts = list(texts)
+    labels = np.arange(len(texts))
+
+    # 完全重复的文本
+    first_seen = {}
+    unique_index = []
+    for i, text in enumerate(texts):
+        if not isinstance(text, str):
+            continue
+        j = first_seen.setdefault(text, i)
+        if j == i:
+            unique_index.append(i)
+        else:
+            labels[i] = j
+    if len(unique_index) <= 1:
+        return labels
+
+    signatures = MinHasher(num_perm).signatures([texts[i] for i in unique_index], k)
+    union_find = _UnionFind(len(unique_index))
+    rows = num_perm // bands
+    for band in range(bands):
+        buckets = {}
+        band_keys = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        for i in range(len(unique_index)):
+            j = buckets.setdefault(band_keys[i].tobytes(), i)
+            if j != i and union_find.find(i) != union_find.find(j):
+                if np.count_nonzero(signatures[i] == signatures[j]) >= threshold * num_perm:
+                    union_find.union(i, j)
+
+    labels[unique_index] = [unique_index[union_find.find(i)] for i in range(len(unique_index))]
+    # 完全重复的文本跟随其首次出现的文本所在的簇
+    return labels[labels]
+
+
+def dedup_report(labels):
+    clusters = len(np.unique(labels))
+    saved = len(labels) - clusters
+    ratio = saved / len(labels) if len(labels) else 0
+    return f'近似去重: {len(labels)} 条文本归为 {clusters} 簇, 少打分 {saved} 条 ({ratio:.1%})'
@@ -0,0 +1,206 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from snapshot_store import DEFAULT_STORE_ROOT, read_new_snapshots
+from io_utils import atomic_json
+
+DEFAULT_INDEX_DIR = 'rank_index'
+
+# 排名矩阵中的特殊值：未上榜为 -1，置顶/广告（在榜但无排名）为 0
+ABSENT = -1
+PINNED = 0
+# 热度矩阵中缺失的热度值
+NO_HOT_VALUE = -1
+
+MATRICES = {'rank': np.int16, 'hot': np.int64}
+
+
+class RankIndex:
+    """热搜排名时间序列索引
+
+    每个话题ID对应一行、每次快照对应一列，排名和热度值分别保存在
+    NumPy 内存映射矩阵中（话题 × 时间）。容量不足时按倍数扩容，
+    新快照只写入新的一列，查询直接按行列下标读取数组。
+    """
+
+    def __init__(self, directory=DEFAULT_INDEX_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.meta_path = os.path.join(directory, 'meta.json')
+        self.topics = []
+        self.snapshots = []
+        # 已处理的快照文件名；补录的旧快照按文件识别，列按写入顺序追加
+        self.processed = set()
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            self.topics = meta['topics']
+            self.snapshots = meta['snapshots']
+            self.processed = set(meta.get('processed', []))
+        self.rows = {topic: row for row, topic in enumerate(self.topics)}
+        self.columns = {snapshot: col for col, snapshot in enumerate(self.snapshots)}
+        self.matrices = {name: self._open(name) for name in MATRICES}
+
+    def _path(self, name):
+        return os.path.join(self.directory, f'{name}.npy')
+
+    def _open(self, name):
+        path = self._path(name)
+        if os.path.exists(path):
+            return np.load(path, mmap_mode='r+')
+        matrix = self._create(name, (64, 64))
+        matrix.flush()
+        del matrix
+        os.replace(path + '.tmp', path)
+        return np.load(path, mmap_mode='r+')
+
+    def _create(self, name, shape):
+        fill = ABSENT if name == 'rank' else NO_HOT_VALUE
+        matrix = np.lib.format.open_memmap(self._path(name) + '.tmp', mode='w+',
+                                           dtype=MATRICES[name], shape=shape)
+        matrix[:] = fill
+        return matrix
+
+    def _reserve(self, rows, cols):
+        """保证矩阵至少有 rows 行、cols 列，不足时按倍数扩容"""
+        shape = self.matrices['rank'].shape
+        if rows <= shape[0] and cols <= shape[1]:
+            return
+        new_shape = (max(shape[0], 1), max(shape[1], 1))
+        while new_shape[0] < rows:
+            new_shape = (new_shape[0] * 2, new_shape[1])
+        while new_shape[1] < cols:
+            new_shape = (new_shape[0], new_shape[1] * 2)
+
+        # 先复制到临时文件，释放新旧映射后再替换，Windows 下不能替换已映射的文件
+        for name in MATRICES:
+            matrix = self.matrices.pop(name)
+            grown = self._create(name, new_shape)
+            grown[:shape[0], :shape[1]] = matrix
+            grown.flush()
+            del matrix, grown
+            os.replace(self._path(name) + '.tmp', self._path(name))
+            self.matrices[name] = np.load(self._path(name), mmap_mode='r+')
+
+    def _row(self, topic):
+        row = self.rows.get(topic)
+        if row is None:
+            row = self.rows[topic] = len(self.topics)
+            self.topics.append(topic)
+        return row
+
+    def _order(self):
+        """按时间排序的列下标（补录的快照追加在后面，列顺序不一定是时间顺序）"""
+        return np.argsort(self.snapshots, kind='stable')
+
+    def add_snapshot(self, snapshot_time, topic_ids, ranks, hot_values):
+        """写入一次快照；该时间已存在时跳过，返回列下标
+
+        ranks 中的空值（置顶/广告）记为 PINNED，hot_values 中的空值记为 NO_HOT_VALUE。
+        """
+        snapshot = pd.Timestamp(snapshot_time).isoformat()
+        if snapshot in self.columns:
+            return self.columns[snapshot]
+
+        rows = np.array([self._row(str(topic)) for topic in topic_ids], dtype=np.int64)
+        col = len(self.snapshots)
+        self._reserve(len(self.topics), col + 1)
+        self.snapshots.append(snapshot)
+        self.columns[snapshot] = col
+
+        ranks = pd.array(ranks, dtype='Int16').fillna(PINNED).to_numpy(dtype=np.int16)
+        hot_values = pd.array(hot_values, dtype='Int64').fillna(NO_HOT_VALUE).to_numpy(dtype=np.int64)
+        self.matrices['rank'][rows, col] = ranks
+        self.matrices['hot'][rows, col] = hot_values
+        return col
+
+    def update(self, root=DEFAULT_STORE_ROOT):
+        """从快照库补录索引中还没有的快照（包括补录的旧快照），返回新增的快照数"""
+        df, names = read_new_snapshots(root, self.processed, columns=['ID', '日期时间', '排名', '热度值'])
+        # 没有ID的条目无法跨快照对应，跳过
+        df = df[df['ID'].astype(str) != '']
+        added = 0
+        for snapshot_time, group in df.sort_values('日期时间').groupby('日期时间', sort=True):
+            # 同一时间多次保存时同一话题只保留第一条
+            group = group.drop_duplicates('ID')
+            self.add_snapshot(snapshot_time, group['ID'].astype(str), group['排名'], group['热度值'])
+            added += 1
+        self.processed.update(names)
+        if names:
+            self.save()
+        return added
+
+    def save(self):
+        """刷新矩阵并写入元数据（先写临时文件再替换）"""
+        for matrix in self.matrices.values():
+            matrix.flush()
+        atomic_json(self.meta_path, {'topics': self.topics, 'snapshots': self.snapshots,
+                                     'processed': sorted(self.processed)})
+
+    def _column(self, snapshot):
+        """snapshot 可以是按时间排序的序号（支持负数，-1 为最新）或时间"""
+        if isinstance(snapshot, (int, np.integer)):
+            return int(self._order()[range(len(self.snapshots))[snapshot]])
+        return self.columns[pd.Timestamp(snapshot).isoformat()]
+
+    def _view(self, name):
+        return self.matrices[name][:len(self.topics), :len(self.snapshots)]
+
+    def trajectory(self, topic_id):
+        """话题在各快照中的排名和热度值，只返回在榜的快照"""
+        row = self.rows.get(str(topic_id))
+        if row is None:
+            return pd.DataFrame(columns=['日期时间', '排名', '热度值'])
+        ranks = self._view('rank')[row]
+        hot = self._view('hot')[row]
+        order = self._order()
+        present = order[ranks[order] != ABSENT]
+        rank = pd.Series(ranks[present], dtype='Int16')
+        rank[rank == PINNED] = pd.NA
+        hot_value = pd.Series(hot[present], dtype='Int64')
+        hot_value[hot_value == NO_HOT_VALUE] = pd.NA
+        return pd.DataFrame({
+            '日期时间': pd.to_datetime([self.snapshots[col] for col in present]),
+            '排名': rank,
+            '热度值': hot_value,
+        })
+
+    def entries_exits(self, before, after):
+        """两次快照之间新上榜和掉榜的话题ID，返回 (上榜列表, 掉榜列表)"""
+        ranks = self._view('rank')
+        was = ranks[:, self._column(before)] != ABSENT
+        now = ranks[:, self._column(after)] != ABSENT
+        entered = [self.topics[row] for row in np.flatnonzero(now & ~was)]
+        exited = [self.topics[row] for row in np.flatnonzero(was & ~now)]
+        return entered, exited
+
+    def top_movers(self, before, after, n=10):
+        """两次快照之间排名变化最大的话题（两次都有排名），上升为正"""
+        ranks = self._view('rank')
+        old = ranks[:, self._column(before)].astype(np.int32)
+        new = ranks[:, self._column(after)].astype(np.int32)
+        ranked = np.flatnonzero((old > 0) & (new > 0))
+        change = old[ranked] - new[ranked]
+        order = np.argsort(-np.abs(change), kind='stable')[:n]
+        rows = ranked[order]
+        return pd.DataFrame({
+            'ID': [self.topics[row] for row in rows],
+            '原排名': old[rows],
+            '现排名': new[rows],
+            '变化': change[order],
+        })
+
+    def report(self):
+        shape = self.matrices['rank'].shape
+        return f'排名索引: {len(self.topics)} 个话题, {len(self.snapshots)} 次快照 (容量 {shape[0]}×{shape[1]})'
+
+
+if __name__ == '__main__':
+    # 用法: python rank_index.py [快照库目录] [索引目录]
+    index = RankIndex(sys.argv[2] if len(sys.argv) > 2 else DEFAULT_INDEX_DIR)
+    added = index.update(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_STORE_ROOT)
+    print(f'新增 {added} 次快照')
+    print(index.report())
@@ -0,0 +1,143 @@
+import atexit
+import hashlib
+import logging
+import os
+import sqlite3
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# 打分器版本：模型或打分逻辑变化时修改此值，旧缓存自动失效
+SCORER_VERSION = 'snownlp-0.12-v1'
+
+# 默认缓存文件，可通过环境变量覆盖，设置为空字符串则只使用内存缓存
+DEFAULT_CACHE_PATH = 'sentiment_results/sentiment_cache.sqlite'
+DEFAULT_CACHE_SIZE = 100000
+
+
+def text_key(text, namespace='clean'):
+    """缓存键：打分器版本 + 命名空间 + 文本的哈希"""
+    raw = f"{SCORER_VERSION}\0{namespace}\0{text}".encode('utf-8')
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+class SentimentCache:
+    """情感得分缓存：内存LRU在前，SQLite持久化在后
+
+    写入先放入缓冲区，由 flush() 批量提交，避免每条结果单独开事务。
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, maxsize=DEFAULT_CACHE_SIZE, flush_every=1000):
+        self.path = path
+        self.maxsize = maxsize
+        self.flush_every = flush_every
+        self.hits = 0
+        self.misses = 0
+        self._lru = OrderedDict()
+        self._pending = {}
+        self._conn = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, timeout=30)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS scores (key TEXT PRIMARY KEY, score REAL NOT NULL)')
+            self._conn.commit()
+
+    def _remember(self, key, score):
+        self._lru[key] = score
+        self._lru.move_to_end(key)
+        if len(self._lru) > self.maxsize:
+            self._lru.popitem(last=False)
+
+    def get(self, text, namespace='clean'):
+        """查询缓存，未命中返回None"""
+        key = text_key(text, namespace)
+        score = self._lru.get(key)
+        if score is None:
+            score = self._pending.get(key)
+        if score is None and self._conn is not None:
+            row = self._conn.execute('SELECT score FROM scores WHERE key = ?', (key,)).fetchone()
+            score = row[0] if row else None
+
+        if score is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._remember(key, score)
+        return score
+
+    def put(self, text, score, namespace='clean'):
+        """写入缓存"""
+        key = text_key(text, namespace)
+        self._remember(key, score)
+        if self._conn is not None:
+            self._pending[key] = score
+            if len(self._pending) >= self.flush_every:
+                self.flush()
+
+    def flush(self):
+        """把缓冲区中的结果批量写入SQLite"""
+        if self._conn is None or not self._pending:
+            return
+        try:
+            with self._conn:
+                self._conn.executemany('INSERT OR REPLACE INTO scores (key, score) VALUES (?, ?)',
+                                       self._pending.items())
+            self._pending.clear()
+        except sqlite3.Error as e:
+            logger.error(f"写入情感缓存失败: {e}")
+
+    def add_stats(self, hits, misses):
+        """累加子进程返回的命中统计"""
+        self.hits += hits
+        self.misses += misses
+
+    def report(self):
+        """返回命中统计信息字符串"""
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0.0
+        return f"情感缓存命中 {self.hits} 次, 未命中 {self.misses} 次, 命中率 {rate:.1f}%"
+
+    def close(self):
+        self.flush()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+_cache = None
+
+
+def get_cache():
+    """获取当前进程的默认缓存实例（子进程会按环境变量重新打开连接）"""
+    global _cache
+    if _cache is None or _cache._pid != os.getpid():
+        path = os.environ.get('WEIBO_SENTIMENT_CACHE', DEFAULT_CACHE_PATH)
+        maxsize = int(os.environ.get('WEIBO_SENTIMENT_CACHE_SIZE', DEFAULT_CACHE_SIZE))
+        _cache = SentimentCache(path, maxsize)
+        _cache._pid = os.getpid()
+    return _cache
+
+
+def configure_cache(path=DEFAULT_CACHE_PATH, maxsize=DEFAULT_CACHE_SIZE):
+    """重新配置默认缓存，path为空时只使用内存LRU
+
+    配置写入环境变量，进程池中的子进程会使用同样的设置。
+    """
+    global _cache
+    if _cache is not None and _cache._pid == os.getpid():
+        _cache.close()
+        _cache = None
+    os.environ['WEIBO_SENTIMENT_CACHE'] = path or ''
+    os.environ['WEIBO_SENTIMENT_CACHE_SIZE'] = str(maxsize)
+    return get_cache()
+
+
+@atexit.register
+def _flush_on_exit():
+    if _cache is not None and _cache._pid == os.getpid():
+        _cache.flush()
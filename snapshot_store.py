@@ -0,0 +1,200 @@
+import glob
+import json
+import os
+import re
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from io_utils import atomic_write
+
+DEFAULT_STORE_ROOT = 'weibohot_store'
+
+# 热搜快照的固定列类型；重复出现的字符串列使用字典编码
+SNAPSHOT_SCHEMA = pa.schema([
+    ('ID', pa.dictionary(pa.int32(), pa.string())),
+    ('日期时间', pa.timestamp('s')),
+    ('排名', pa.int16()),  # 置顶/广告为空
+    ('标题', pa.dictionary(pa.int32(), pa.string())),
+    ('热度值', pa.int64()),
+    ('热度类型', pa.dictionary(pa.int8(), pa.string())),
+    ('链接', pa.dictionary(pa.int32(), pa.string())),
+])
+
+# 可空整数列转换为 pandas 的可空整数类型，避免变成浮点
+PANDAS_TYPES = {pa.int16(): pd.Int16Dtype(), pa.int64(): pd.Int64Dtype()}
+
+PARTITIONING = ds.partitioning(pa.schema([('date', pa.string())]), flavor='hive')
+
+# 合并后的日文件在 Parquet 元数据中记录所含的原始快照文件及其行范围
+SOURCES_METADATA_KEY = b'snapshot_sources'
+
+
+def parse_rank(rank):
+    """排名转为整数，置顶等非数字排名返回None"""
+    rank = str(rank).strip()
+    return int(rank) if rank.isdigit() else None
+
+
+def parse_hot_value(hot_value):
+    """从热度文本（如“剧集 123456”）中提取数值，没有数字时返回None"""
+    match = re.search(r'\d+', str(hot_value or '').replace(',', ''))
+    return int(match.group()) if match else None
+
+
+def parse_snapshot_time(value):
+    """日期时间字段支持 datetime 或 YYYYMMDDHHMM(SS) 字符串"""
+    if isinstance(value, datetime):
+        return value
+    value = str(value)
+    return datetime.strptime(value, '%Y%m%d%H%M%S' if len(value) == 14 else '%Y%m%d%H%M')
+
+
+def snapshot_table(hot_data):
+    """把 weibo.py 生成的 hot_data 字典列表转换为固定结构的 Arrow 表"""
+    columns = {
+        'ID': [item['ID'] for item in hot_data],
+        '日期时间': [parse_snapshot_time(item['日期时间']) for item in hot_data],
+        '排名': [parse_rank(item['排名']) for item in hot_data],
+        '标题': [item['标题'] for item in hot_data],
+        '热度值': [parse_hot_value(item['热度值']) for item in hot_data],
+        '热度类型': [item['热度类型'] for item in hot_data],
+        '链接': [item['链接'] for item in hot_data],
+    }
+    return pa.table(columns, schema=SNAPSHOT_SCHEMA)
+
+
+def append_snapshot(hot_data, root=DEFAULT_STORE_ROOT):
+    """把一次抓取的快照追加到按日期分区的 Parquet 数据集，返回写入的文件路径"""
+    if not hot_data:
+        return None
+    snapshot_time = parse_snapshot_time(hot_data[0]['日期时间'])
+    partition_dir = os.path.join(root, f"date={snapshot_time:%Y-%m-%d}")
+    os.makedirs(partition_dir, exist_ok=True)
+    path = os.path.join(partition_dir, f"snapshot_{snapshot_time:%Y%m%d%H%M%S}.parquet")
+    # 同一分钟内多次保存时加序号，避免覆盖
+    suffix = 1
+    while os.path.exists(path):
+        path = os.path.join(partition_dir, f"snapshot_{snapshot_time:%Y%m%d%H%M%S}_{suffix}.parquet")
+        suffix += 1
+    pq.write_table(snapshot_table(hot_data), path)
+    return path
+
+
+def snapshot_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def snapshot_sources(path):
+    """文件中包含的原始快照：[(快照文件名, 起始行, 行数)]
+
+    append_snapshot 写下的文件只包含自己，合并出的日文件从元数据读取。
+    """
+    metadata = pq.read_metadata(path)
+    recorded = (metadata.metadata or {}).get(SOURCES_METADATA_KEY)
+    if recorded is not None:
+        return [tuple(source) for source in json.loads(recorded)]
+    return [(snapshot_name(path), 0, metadata.num_rows)]
+
+
+def compact_partition(root, date):
+    """把某一天的所有快照文件合并为一个日文件，减少小文件数量，返回是否有改动
+
+    先写隐藏的临时文件（点开头，读取数据集时会被忽略）并替换日文件，
+    再删除被合并的原文件。中途中断时原文件都还在；已经记录在日文件中的
+    原文件在下次合并时直接删除，不会重复计入。
+    """
+    partition_dir = os.path.join(root, f"date={date}")
+    day_path = os.path.join(partition_dir, f"snapshot_{date.replace('-', '')}_day.parquet")
+    paths = sorted(glob.glob(os.path.join(partition_dir, 'snapshot_*.parquet')))
+    contained = {name for name, _, _ in snapshot_sources(day_path)} if day_path in paths else set()
+    leftovers = [path for path in paths if path != day_path and snapshot_name(path) in contained]
+    paths = [path for path in paths if path not in leftovers]
+
+    if len(paths) > 1:
+        tables = []
+        sources = []
+        offset = 0
+        for path in paths:
+            table = pq.read_table(path, schema=SNAPSHOT_SCHEMA)
+            sources.extend([name, offset + start, rows] for name, start, rows in snapshot_sources(path))
+            offset += table.num_rows
+            tables.append(table)
+        table = pa.concat_tables(tables).replace_schema_metadata(
+            {SOURCES_METADATA_KEY: json.dumps(sources, ensure_ascii=False)})
+        atomic_write(day_path, lambda tmp_path: pq.write_table(table, tmp_path),
+                     tmp_path=os.path.join(partition_dir, '.compacting.parquet.tmp'))
+        leftovers.extend(path for path in paths if path != day_path)
+
+    for path in leftovers:
+        os.remove(path)
+    return bool(leftovers)
+
+
+def compact_closed_partitions(root=DEFAULT_STORE_ROOT, today=None):
+    """合并 today（默认今天）之前所有日期分区中的快照文件，返回合并的分区数"""
+    today = today or datetime.now().strftime('%Y-%m-%d')
+    compacted = 0
+    for partition_dir in sorted(glob.glob(os.path.join(root, 'date=*'))):
+        date = os.path.basename(partition_dir)[len('date='):]
+        if date < today and compact_partition(root, date):
+            compacted += 1
+    return compacted
+
+
+def read_new_snapshots(root=DEFAULT_STORE_ROOT, processed=(), columns=None):
+    """读取 processed 中还没有的快照，返回 (DataFrame, 本次读到的快照名列表)
+
+    按快照文件而不是按最大时间判断是否处理过，补录的旧快照也会被读到；
+    合并后的日文件按元数据中记录的原始文件逐个判断，只读取其中新的行。
+    快照名形如 “2025-06-07/snapshot_20250607100000”。
+    """
+    processed = set(processed)
+    tables = []
+    names = []
+    for partition_dir in sorted(glob.glob(os.path.join(root, 'date=*'))):
+        date = os.path.basename(partition_dir)[len('date='):]
+        paths = sorted(glob.glob(os.path.join(partition_dir, 'snapshot_*.parquet')),
+                       key=lambda path: not path.endswith('_day.parquet'))
+        contained = set()
+        for path in paths:
+            if path.endswith('_day.parquet'):
+                sources = snapshot_sources(path)
+                contained.update(name for name, _, _ in sources)
+            elif snapshot_name(path) in contained:
+                continue  # 合并中断时留下的原文件，内容已在日文件中
+            else:
+                sources = [(snapshot_name(path), 0, None)]
+            new = [(f'{date}/{name}', start, rows) for name, start, rows in sources
+                   if f'{date}/{name}' not in processed]
+            if not new:
+                continue
+            table = pq.read_table(path, columns=columns, schema=SNAPSHOT_SCHEMA)
+            tables.extend(table if rows is None else table.slice(start, rows) for _, start, rows in new)
+            names.extend(name for name, _, _ in new)
+    schema = SNAPSHOT_SCHEMA if columns is None else pa.schema([SNAPSHOT_SCHEMA.field(col) for col in columns])
+    table = pa.concat_tables(tables) if tables else schema.empty_table()
+    return table.to_pandas(types_mapper=PANDAS_TYPES.get), names
+
+
+def read_snapshots(root=DEFAULT_STORE_ROOT, columns=None, start=None, end=None, filter=None):
+    """读取快照数据集，返回 pandas DataFrame
+
+    columns 指定只读取的列；start/end 为日期字符串 YYYY-MM-DD（含），
+    按分区目录裁剪，不会打开范围外的文件；filter 为额外的 pyarrow 表达式。
+    """
+    if not os.path.isdir(root):
+        return SNAPSHOT_SCHEMA.empty_table().to_pandas(types_mapper=PANDAS_TYPES.get)
+    dataset = ds.dataset(root, schema=SNAPSHOT_SCHEMA.append(pa.field('date', pa.string())),
+                         format='parquet', partitioning=PARTITIONING)
+    expression = filter
+    if start is not None:
+        condition = ds.field('date') >= start
+        expression = condition if expression is None else expression & condition
+    if end is not None:
+        condition = ds.field('date') <= end
+        expression = condition if expression is None else expression & condition
+    return dataset.to_table(columns=columns, filter=expression).to_pandas(types_mapper=PANDAS_TYPES.get)
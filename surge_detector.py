@@ -0,0 +1,149 @@
+import json
+import math
+import os
+from datetime import datetime, timedelta
+
+from snapshot_store import parse_hot_value, parse_rank, parse_snapshot_time
+from io_utils import atomic_json
+
+
+class TopicStats:
+    """单个话题的指数加权滑动统计，每个话题占用固定内存"""
+
+    __slots__ = ('count', 'mean', 'var', 'velocity_mean', 'velocity_var',
+                 'last_hot', 'last_rank', 'last_time')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.var = 0.0
+        self.velocity_mean = 0.0
+        self.velocity_var = 0.0
+        self.last_hot = None
+        self.last_rank = None
+        self.last_time = None
+
+    def to_list(self):
+        return [getattr(self, name) for name in self.__slots__[:-1]] + [
+            self.last_time.isoformat() if self.last_time else None]
+
+    @classmethod
+    def from_list(cls, values):
+        stats = cls()
+        for name, value in zip(cls.__slots__[:-1], values):
+            setattr(stats, name, value)
+        stats.last_time = datetime.fromisoformat(values[-1]) if values[-1] else None
+        return stats
+
+
+def ewma_update(mean, var, value, alpha):
+    """指数加权均值和方差的增量更新，返回 (新均值, 新方差)"""
+    diff = value - mean
+    increment = alpha * diff
+    return mean + increment, (1 - alpha) * (var + diff * increment)
+
+
+def z_score(value, mean, var, min_std):
+    return (value - mean) / max(math.sqrt(var), min_std)
+
+
+class SurgeDetector:
+    """热度值与排名速度的流式突增检测
+
+    每次快照到来时逐条更新话题的 EWMA 均值和方差，热度值或排名上升速度
+    （名次/小时）偏离均值超过 threshold 个标准差、且热度达到均值的
+    min_hot_ratio 倍或名次上升至少 min_rank_gain 时产生告警。只保存每个话题
+    的滑动统计，不回看历史快照；超过 expire_hours 未上榜的话题会被清除。
+    """
+
+    def __init__(self, alpha=0.3, threshold=3.0, min_observations=3, min_hot_ratio=1.5, min_rank_gain=5,
+                 expire_hours=24, state_path=None):
+        self.alpha = alpha
+        self.threshold = threshold
+        self.min_observations = min_observations
+        self.min_hot_ratio = min_hot_ratio
+        self.min_rank_gain = min_rank_gain
+        self.expire = timedelta(hours=expire_hours)
+        self.state_path = state_path
+        self.topics = {}
+        if state_path and os.path.exists(state_path):
+            with open(state_path, 'r', encoding='utf-8') as f:
+                self.topics = {topic: TopicStats.from_list(values) for topic, values in json.load(f).items()}
+
+    def _check(self, topic, title, stats, hot, rank, snapshot_time):
+        """用更新前的统计量判断本次是否突增，返回告警列表"""
+        alerts = []
+        if stats.count < self.min_observations:
+            return alerts
+
+        if hot is not None:
+            # 标准差下限取均值的 1%，避免长期不变的热度值一有波动就告警
+            score = z_score(hot, stats.mean, stats.var, 0.01 * abs(stats.mean) + 1)
+            if score > self.threshold and hot >= self.min_hot_ratio * stats.mean:
+                alerts.append({'ID': topic, '标题': title, '日期时间': snapshot_time, '类型': '热度突增',
+                               '热度值': hot, '均值': round(stats.mean), 'z': round(score, 2)})
+
+        if rank is not None and stats.last_rank is not None:
+            gain = stats.last_rank - rank
+            hours = (snapshot_time - stats.last_time).total_seconds() / 3600 or 1 / 60
+            score = z_score(gain / hours, stats.velocity_mean, stats.velocity_var, 1.0)
+            if gain >= self.min_rank_gain and score > self.threshold:
+                alerts.append({'ID': topic, '标题': title, '日期时间': snapshot_time, '类型': '排名飙升',
+                               '排名': rank, '上升': gain, 'z': round(score, 2)})
+        return alerts
+
+    def update(self, hot_data):
+        """处理一次快照（weibo.py 的 hot_data 列表），返回本次的告警列表"""
+        if not hot_data:
+            return []
+        snapshot_time = parse_snapshot_time(hot_data[0]['日期时间'])
+        alerts = []
+        for item in hot_data:
+            topic = item['ID']
+            if not topic:
+                continue
+            hot = parse_hot_value(item['热度值'])
+            rank = parse_rank(item['排名'])
+            stats = self.topics.get(topic)
+            if stats is None:
+                stats = self.topics[topic] = TopicStats()
+            elif stats.last_time is not None and snapshot_time <= stats.last_time:
+                continue  # 重复或更早的快照
+
+            alerts.extend(self._check(topic, item['标题'], stats, hot, rank, snapshot_time))
+
+            if hot is not None:
+                if stats.count == 0:
+                    stats.mean = float(hot)
+                else:
+                    stats.mean, stats.var = ewma_update(stats.mean, stats.var, hot, self.alpha)
+                stats.count += 1
+                stats.last_hot = hot
+            if rank is not None:
+                if stats.last_rank is not None:
+                    hours = (snapshot_time - stats.last_time).total_seconds() / 3600 or 1 / 60
+                    stats.velocity_mean, stats.velocity_var = ewma_update(
+                        stats.velocity_mean, stats.velocity_var, (stats.last_rank - rank) / hours, self.alpha)
+                stats.last_rank = rank
+            else:
+                stats.last_rank = None
+            stats.last_time = snapshot_time
+
+        # 清除长时间未上榜的话题
+        cutoff = snapshot_time - self.expire
+        for topic in [topic for topic, stats in self.topics.items() if stats.last_time < cutoff]:
+            del self.topics[topic]
+        return alerts
+
+    def save(self):
+        """保存滑动统计，进程重启后继续使用（先写临时文件再替换）"""
+        if not self.state_path:
+            return
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        atomic_json(self.state_path, {topic: stats.to_list() for topic, stats in self.topics.items()})
+
+
+def format_alert(alert):
+    if alert['类型'] == '热度突增':
+        return f"[{alert['类型']}] {alert['标题']} 热度 {alert['热度值']}（均值 {alert['均值']}，z={alert['z']}）"
+    return f"[{alert['类型']}] {alert['标题']} 升至第 {alert['排名']} 名，上升 {alert['上升']} 名（z={alert['z']}）"
@@ -0,0 +1,16 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+# 模块都在仓库根目录下
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 在临时目录中运行，模块导入时创建的目录、分词和情感缓存不写入仓库
+_workdir = tempfile.mkdtemp(prefix='opo_tests_')
+os.chdir(_workdir)
+# 退出时落盘的缓存用绝对路径，不受之后工作目录变化的影响
+os.environ['WEIBO_TOKEN_STORE'] = os.path.join(_workdir, 'token_cache')
+os.environ['WEIBO_SENTIMENT_CACHE'] = os.path.join(_workdir, 'sentiment_cache.sqlite')
+atexit.register(shutil.rmtree, _workdir, ignore_errors=True)
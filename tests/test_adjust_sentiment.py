@@ -0,0 +1,36 @@
+import pytest
+
+from weibohot_analysis import adjust_sentiment, contains_negative_words, contains_positive_words
+
+# 同时命中正面和负面词典的文本，以及只命中一边或都不命中的文本
+TEXTS = ['不支持', '这个不好', '没有问题就是好', '失败是成功之母', '好开心', '事故', '今天天气一般', '']
+
+
+def contains_rule(text, base_score):
+    """原来按 contains_* 判断的调整规则"""
+    if contains_negative_words(text):
+        adjusted_score = base_score * 0.7
+    elif contains_positive_words(text):
+        adjusted_score = base_score * 1.3
+    else:
+        adjusted_score = base_score
+    adjusted_score = max(0, min(1, adjusted_score))
+    if adjusted_score > 0.7:
+        return "positive", adjusted_score
+    elif adjusted_score < 0.3:
+        return "negative", adjusted_score
+    return "neutral", adjusted_score
+
+
+@pytest.mark.parametrize('text', TEXTS)
+@pytest.mark.parametrize('base_score', [0.0, 0.35, 0.5, 0.6, 0.95])
+def test_default_rule_matches_contains_logic(text, base_score):
+    label, score = adjust_sentiment(text, base_score)
+    expected_label, expected_score = contains_rule(text, base_score)
+    assert label == expected_label
+    assert score == pytest.approx(expected_score)
+
+
+def test_net_weight_is_opt_in():
+    assert adjust_sentiment('不支持', 0.5)[1] == pytest.approx(0.35)
+    assert adjust_sentiment('不支持', 0.5, net_weight=True)[1] == pytest.approx(0.5)
@@ -0,0 +1,35 @@
+import pandas as pd
+
+import analytics_cube
+from analytics_cube import UNKNOWN, CubeStore
+
+
+def test_query_by_topic(tmp_path):
+    store = CubeStore(str(tmp_path / 'cube'))
+    store.update('a.jsonl', pd.DataFrame({
+        '微博ID': ['1', '1', '2', '3'],
+        '话题ID': ['%23高考%23', '%23高考%23', '%23台风%23', None],
+        '情感得分': [0.9, 0.7, 0.2, 0.5],
+    }))
+    store.save()
+    by_topic = store.query(['话题ID'])
+    assert by_topic.loc['%23高考%23', '数量'] == 2
+    assert abs(by_topic.loc['%23高考%23', '平均得分'] - 0.8) < 1e-9
+    assert by_topic.loc['%23台风%23', '数量'] == 1
+    assert by_topic.loc[UNKNOWN, '数量'] == 1
+
+
+def test_old_cube_without_topic(tmp_path, monkeypatch):
+    root = str(tmp_path / 'cube')
+    with monkeypatch.context() as m:
+        m.setattr(analytics_cube, 'DIMENSIONS', [dim for dim in analytics_cube.DIMENSIONS if dim != '话题ID'])
+        old = CubeStore(root)
+        old.update('old.xlsx', pd.DataFrame({'微博ID': ['1'], '情感得分': [0.6]}))
+        old.save()
+
+    store = CubeStore(root)
+    assert store.query(['话题ID']).loc[UNKNOWN, '数量'] == 1
+    store.update('new.jsonl', pd.DataFrame({'微博ID': ['2'], '话题ID': ['%23高考%23'], '情感得分': [0.4]}))
+    store.save()
+    by_topic = CubeStore(root).query(['话题ID'])
+    assert by_topic['数量'].to_dict() == {UNKNOWN: 1, '%23高考%23': 1}
@@ -0,0 +1,25 @@
+import pytest
+from snownlp import SnowNLP
+
+from bayes_scorer import TOLERANCE, get_scorer
+
+TEXTS = [
+    '这部电影真的太好看了',
+    '服务态度很差，再也不来了',
+    '今天天气一般',
+    '高考英语作文题目公布',
+    '哈哈哈哈',
+    'abc 123',
+    '不喜欢也不讨厌',
+]
+
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_score_matches_snownlp(text):
+    assert get_scorer().score(text) == pytest.approx(SnowNLP(text).sentiments, abs=TOLERANCE)
+
+
+def test_score_batch_matches_single():
+    scorer = get_scorer()
+    batch = scorer.score_batch(TEXTS)
+    assert list(batch) == pytest.approx([scorer.score(text) for text in TEXTS], abs=TOLERANCE)
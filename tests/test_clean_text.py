@@ -0,0 +1,46 @@
+import random
+import re
+
+import pandas as pd
+
+from weibohot_analysis import clean_series, clean_text
+
+
+def baseline_clean_text(text):
+    """原来逐条执行三次 re.sub 的实现"""
+    if not isinstance(text, str):
+        return ""
+    text = re.sub(r'http\S+|www\S+|https\S+', '', text, flags=re.MULTILINE)
+    text = re.sub(r'[^\w\s]', '', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+SAMPLES = [
+    '高考英语 作文题目公布！！ http://t.cn/abc123 #话题#',
+    '  多个   空格\n换行\t制表  ',
+    'www.weibo.com/123 看看',
+    '表情😀和标点，。？',
+    'https://a.b/c?d=1&e=2结尾',
+    'ahttp://x 前面有字母',
+    '',
+]
+
+
+def random_texts(count=500, seed=0):
+    rng = random.Random(seed)
+    pieces = ['http', 'https://', 'www', '.', '/', ' ', '\n', '，', '！', '#', '高考', '英语', 'a', '1', '😀', '_']
+    return [''.join(rng.choice(pieces) for _ in range(rng.randint(0, 12))) for _ in range(count)]
+
+
+def test_clean_text_matches_baseline():
+    for text in SAMPLES + random_texts() + [None, 3.5]:
+        assert clean_text(text) == baseline_clean_text(text)
+
+
+def test_clean_series_matches_clean_text():
+    values = SAMPLES + random_texts(100) + [None, float('nan'), 42, SAMPLES[0]]
+    series = pd.Series(values, index=range(10, 10 + len(values)))
+    result = clean_series(series)
+    assert result.index.equals(series.index)
+    assert result.tolist() == [baseline_clean_text(value) for value in values]
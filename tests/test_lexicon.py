@@ -0,0 +1,48 @@
+import random
+
+import pandas as pd
+import pytest
+
+import lexicon
+from lexicon import LexiconMatcher, NEGATIVE_WORDS, POSITIVE_WORDS
+
+LEXICONS = {
+    'negative': {**NEGATIVE_WORDS, '不好': 0.5},
+    'positive': {**POSITIVE_WORDS, '好好': 2.0},
+}
+
+
+def substring_weights(text, lexicons):
+    """逐词逐位置做子串比较，允许重叠，作为自动机结果的对照"""
+    totals = dict.fromkeys(lexicons, 0.0)
+    for label, words in lexicons.items():
+        for word, weight in words.items():
+            count = sum(text.startswith(word, i) for i in range(len(text)))
+            totals[label] += count * weight
+    return totals
+
+
+def random_texts(count=300, seed=0):
+    rng = random.Random(seed)
+    alphabet = sorted(set(''.join(LEXICONS['negative']) + ''.join(LEXICONS['positive']))) + list('的了 a1，')
+    return [''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 30))) for _ in range(count)]
+
+
+@pytest.fixture(params=['python', 'c'])
+def matcher(request, monkeypatch):
+    if request.param == 'python':
+        monkeypatch.setattr(lexicon, 'ahocorasick', None)
+    elif lexicon.ahocorasick is None:
+        pytest.skip('pyahocorasick 未安装')
+    return LexiconMatcher(LEXICONS)
+
+
+def test_weigh_matches_substring_scan(matcher):
+    for text in random_texts() + ['不好好', '没有问题', '好好好', '']:
+        assert matcher.weigh(text) == pytest.approx(substring_weights(text, LEXICONS))
+
+
+def test_match_series_skips_non_text(matcher):
+    result = matcher.match_series(pd.Series(['很好', None, 3.5, '失败']))
+    assert result['positive'].tolist() == [1.0, 0.0, 0.0, 0.0]
+    assert result['negative'].tolist() == [0.0, 0.0, 0.0, 1.0]
@@ -0,0 +1,39 @@
+import json
+
+import pandas as pd
+
+from merge_pipeline import list_workbooks, merge_incremental, store_dir_for, store_parts
+
+
+def write_comments(path, texts):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i, text in enumerate(texts):
+            record = {'微博ID': str(5000 + i), '话题ID': '%23高考%23', '评论': text, '日期': '06-07 10:00'}
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def test_list_workbooks_scans_extra_dirs(tmp_path):
+    (tmp_path / 'a.xlsx').write_bytes(b'')
+    (tmp_path / 'notes.txt').write_text('')
+    comments_dir = tmp_path / 'weibo_comments'
+    comments_dir.mkdir()
+    write_comments(comments_dir / 'comments_1.jsonl', ['好'])
+    (comments_dir / 'nested').mkdir()
+    write_comments(comments_dir / 'nested' / 'comments_2.jsonl', ['好'])
+
+    paths = list_workbooks(str(tmp_path), exclude=[str(tmp_path / 'a.xlsx')],
+                           extra_dirs=[str(comments_dir), str(tmp_path / 'missing')])
+    assert paths == [str(comments_dir / 'comments_1.jsonl')]
+
+
+def test_merge_includes_crawler_output(tmp_path):
+    comments_dir = tmp_path / 'weibo_comments'
+    comments_dir.mkdir()
+    pd.DataFrame({'评论': ['高考英语很难'], '日期': ['06-07 10:00']}).to_excel(tmp_path / 'manual.xlsx', index=False)
+    write_comments(comments_dir / 'comments_1.jsonl', ['高考加油', '作文题目不错'])
+    output = str(tmp_path / 'merged.xlsx')
+
+    merge_incremental(str(tmp_path), '评论', output, workers=1, extra_dirs=[str(comments_dir)])
+    merged = pd.concat([pd.read_parquet(path) for path in store_parts(store_dir_for(output))])
+    assert sorted(merged['评论']) == sorted(['高考英语很难', '高考加油', '作文题目不错'])
+    assert merged['情感得分'].notna().all()
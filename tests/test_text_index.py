@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from text_index import (TextIndex, decode_postings, decode_varints, encode_segment, encode_varints, parse_query,
+                        tokenize)
+
+TEXTS = [
+    '高考英语作文题目公布',
+    '今年高考英语难不难',
+    '英语高考作文满分范文',
+    '台风登陆广东沿海',
+    '高考 英语 作文',
+    '广东高考英语作文题目',
+    '',
+    '作文题目 高考英语',
+]
+
+
+@pytest.mark.parametrize('values', [
+    [],
+    [0],
+    [127, 128, 255, 16383, 16384],
+    [2 ** 62, 1, 2 ** 35 + 7],
+    list(np.random.default_rng(0).integers(0, 2 ** 40, 1000)),
+])
+def test_varint_round_trip(values):
+    buf, lengths = encode_varints(values)
+    assert len(buf) == lengths.sum()
+    assert decode_varints(buf).tolist() == [int(value) for value in values]
+
+
+def test_segment_postings_round_trip():
+    postings = {
+        'a': [(0, [0, 3]), (5, [1]), (9, [0, 2, 7])],
+        'b': [(2, [4])],
+    }
+    table = encode_segment(postings)
+    for term, buf in zip(table.column('term').to_pylist(), table.column('postings').to_pylist()):
+        docs, counts, positions = decode_postings(np.frombuffer(buf, dtype=np.uint8))
+        expected = postings[term]
+        assert docs.tolist() == [doc for doc, _ in expected]
+        assert counts.tolist() == [len(doc_positions) for _, doc_positions in expected]
+        assert positions.tolist() == [p for _, doc_positions in expected for p in doc_positions]
+
+
+def brute_force(token_lists, phrase):
+    """逐篇文档扫描连续的词序列"""
+    matched = set()
+    for doc, tokens in enumerate(token_lists):
+        if any(tokens[i:i + len(phrase)] == phrase for i in range(len(tokens) - len(phrase) + 1)):
+            matched.add(doc)
+    return matched
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = TextIndex(str(tmp_path / 'index'))
+    index.add_frame('a', pd.DataFrame({'评论': TEXTS[:4]}))
+    index.add_frame('b', pd.DataFrame({'评论': TEXTS[4:]}))
+    return index
+
+
+@pytest.mark.parametrize('query', ['"高考英语"', '高考 英语', '"英语 作文"', '"作文题目"', '广东', '"台风 高考"'])
+def test_phrase_query_matches_brute_force(index, query):
+    # 空文本不建文档，文档ID按非空文本的顺序编号
+    token_lists = [tokens for tokens in tokenize(TEXTS) if tokens]
+    expected = set.intersection(*(brute_force(token_lists, phrase) for phrase in parse_query(query)))
+    assert set(index.match(query).tolist()) == expected
+
+
+def test_phrase_query_requires_adjacent_terms(index):
+    assert index.count('"高考英语"') > index.count('"英语高考"')
+    assert index.count('"台风 高考"') == 0
+
+
+def test_removed_source_is_not_matched(index, tmp_path):
+    before = set(index.match('高考').tolist())
+    index.remove('a')
+    index.save()
+    reopened = TextIndex(str(tmp_path / 'index'))
+    assert set(reopened.match('高考').tolist()) == {doc for doc in before if doc >= 4}
+
+
+def test_frame_without_text_column(index):
+    assert index.add_frame('titles', pd.DataFrame({'标题': ['高考英语']})) == 0
+    assert 'titles' in index.meta['sources']
+
+
+def test_merge_skips_workbook_without_comments(tmp_path):
+    from analytics_cube import CubeStore
+    from merge_pipeline import merge_incremental
+
+    source_dir = tmp_path / 'src'
+    source_dir.mkdir()
+    pd.DataFrame({'标题': ['高考英语作文题目公布'], '排名': [1]}).to_excel(source_dir / 'titles.xlsx', index=False)
+    pd.DataFrame({'评论': ['高考英语很难'], '日期': ['06-07 10:00']}).to_excel(source_dir / 'comments.xlsx', index=False)
+    output = str(tmp_path / 'merged.xlsx')
+    index = TextIndex(str(tmp_path / 'index'))
+    for _ in range(2):
+        merge_incremental(str(source_dir), '评论', output, workers=1, cube=CubeStore(str(tmp_path / 'cube')),
+                          text_index=index)
+    assert index.count('高考') == 1
+    assert len(index.meta['sources']) == 2
@@ -0,0 +1,45 @@
+import pandas as pd
+
+from analytics_cube import CubeStore
+from snapshot_store import append_snapshot
+from topic_clusters import TopicClusterer
+
+
+def hot_item(topic_id, time, rank, title, hot):
+    return {'ID': topic_id, '日期时间': time, '排名': str(rank), '标题': title, '热度值': f'剧集 {hot}',
+            '热度类型': '', '链接': f'https://s.weibo.com/weibo?q={topic_id}'}
+
+
+def test_summary_joins_comments_on_topic_id(tmp_path):
+    store = str(tmp_path / 'store')
+    append_snapshot([
+        hot_item('%23高考作文题目%23', '20250607100000', 1, '高考作文题目公布', 900),
+        hot_item('%23台风登陆%23', '20250607100000', 2, '台风登陆广东沿海', 500),
+    ], store)
+    append_snapshot([
+        hot_item('%23台风登陆%23', '20250607110000', 1, '台风登陆广东沿海', 800),
+        hot_item('%23今年高考作文题目%23', '20250607110000', 2, '今年高考作文题目', 700),
+    ], store)
+    clusterer = TopicClusterer(str(tmp_path / 'clusters'))
+    assert clusterer.update(store) == 3
+    cluster_of = clusterer.topics.set_index('ID')['簇']
+
+    # 评论的微博ID是帖子 mid，和话题ID不同；没有话题ID的评论不计入
+    cube = CubeStore(str(tmp_path / 'cube'))
+    cube.update('comments.jsonl', pd.DataFrame({
+        '微博ID': ['5001', '5001', '5002', '5003', '5004', '5005'],
+        '话题ID': ['%23高考作文题目%23', '%23高考作文题目%23', '%23今年高考作文题目%23', '%23台风登陆%23',
+                 None, '%23其他话题%23'],
+        '情感得分': [0.9, 0.7, 0.5, 0.2, 0.1, 0.3],
+    }))
+    cube.save()
+
+    summary = clusterer.summary(cube)
+    expected = pd.DataFrame({
+        '簇': [cluster_of['%23高考作文题目%23']] * 2 + [cluster_of['%23今年高考作文题目%23'], cluster_of['%23台风登陆%23']],
+        '得分': [0.9, 0.7, 0.5, 0.2],
+    }).groupby('簇')['得分'].agg(['size', 'mean'])
+    assert summary['评论数'].sum() == 4
+    for cluster_id, row in expected.iterrows():
+        assert summary.loc[cluster_id, '评论数'] == row['size']
+        assert abs(summary.loc[cluster_id, '平均得分'] - row['mean']) < 1e-4
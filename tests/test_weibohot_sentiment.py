@@ -0,0 +1,28 @@
+import importlib
+
+import pandas as pd
+
+from snapshot_store import append_snapshot
+from weibohot_analysis import raw_sentiment_score
+
+weibohot_sentiment = importlib.import_module('weibohot_情感分析')
+
+
+def hot_item(topic_id, time, rank, title):
+    return {'ID': topic_id, '日期时间': time, '排名': str(rank), '标题': title, '热度值': '剧集 1000',
+            '热度类型': '', '链接': ''}
+
+
+def test_reads_snapshot_store_without_workbooks(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = str(tmp_path / 'store')
+    append_snapshot([hot_item('%23a%23', '20250607100000', 1, '高考顺利'),
+                     hot_item('%23b%23', '20250607100000', 2, '台风造成严重损失')], store)
+    append_snapshot([hot_item('%23a%23', '20250607110000', 1, '高考顺利')], store)
+
+    output = str(tmp_path / 'out.csv')
+    weibohot_sentiment.main(workers=1, output_file_path=output, store_root=store)
+    df = pd.read_csv(output)
+    assert len(df) == 3
+    for title, score in zip(df['标题'], df['情感得分']):
+        assert abs(score - raw_sentiment_score(title)) < 1e-9
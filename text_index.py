@@ -0,0 +1,439 @@
+import json
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from snapshot_store import DEFAULT_STORE_ROOT, read_new_snapshots
+from token_store import get_token_store
+from weibohot_analysis import clean_series
+from analytics_cube import parse_comment_time
+from io_utils import atomic_json
+
+DEFAULT_INDEX_DIR = 'text_index'
+
+# 文档类型：热搜标题和评论
+KINDS = ['标题', '评论']
+# 段数超过该值时自动合并为一个段
+MAX_SEGMENTS = 16
+# 短语匹配时每篇文档的词位置上限（位置编码在文档ID的低位）
+POSITION_BITS = 20
+
+SEGMENT_SCHEMA = pa.schema([('term', pa.string()), ('postings', pa.large_binary())])
+
+_PHRASE_RE = re.compile(r'"([^"]+)"|“([^”]+)”|(\S+)')
+
+
+def title_keys(ids, titles):
+    """热搜标题文档的去重键：话题ID（没有时用标题）加标题"""
+    return ids.where(ids != '', '#' + titles) + '|' + titles
+
+
+def encode_varints(values):
+    """把非负整数数组编码为变长字节（每字节低 7 位为数据，最高位表示后面还有字节）
+
+    返回 (字节数组, 每个数占用的字节数)。
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    lengths = np.ones(len(values), dtype=np.int64)
+    rest = values >> np.uint64(7)
+    while rest.any():
+        lengths += rest > 0
+        rest >>= np.uint64(7)
+    starts = np.cumsum(lengths) - lengths
+    out = np.empty(int(lengths.sum()), dtype=np.uint8)
+    for k in range(int(lengths.max()) if len(values) else 0):
+        selected = lengths > k
+        byte = (values[selected] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        byte |= np.where(lengths[selected] > k + 1, np.uint64(0x80), np.uint64(0))
+        out[starts[selected] + k] = byte
+    return out, lengths
+
+
+def decode_varints(buf):
+    """encode_varints 的逆操作"""
+    buf = np.asarray(buf, dtype=np.uint8)
+    if not len(buf):
+        return np.empty(0, dtype=np.int64)
+    ends = np.flatnonzero(buf < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    shifts = np.arange(len(buf)) - np.repeat(starts, ends - starts + 1)
+    parts = (buf & 0x7F).astype(np.uint64) << (7 * shifts).astype(np.uint64)
+    return np.bitwise_or.reduceat(parts, starts).astype(np.int64)
+
+
+def decode_postings(buf):
+    """解码一个词的倒排表，返回 (文档ID, 每篇文档中的位置数, 位置)，位置按文档依次排列"""
+    values = decode_varints(buf)
+    n = int(values[0])
+    docs = np.cumsum(values[1:1 + n])
+    counts = values[1 + n:1 + 2 * n]
+    deltas = values[1 + 2 * n:]
+    # 位置在每篇文档内做了差分，累加后减去前面文档的累计值
+    cumulative = np.cumsum(deltas)
+    offsets = np.cumsum(counts) - counts
+    base = np.repeat(cumulative[offsets] - deltas[offsets], counts) if n else cumulative
+    return docs, counts, cumulative - base
+
+
+def encode_segment(postings):
+    """把 {词: [(文档ID, [位置...]), ...]} 编码为段表
+
+    每个词的倒排表为：文档数、文档ID差分、每篇文档的位置数、文档内位置差分，
+    全部用变长整数编码。所有词的数值一次性编码，再按词切分字节。
+    """
+    terms = sorted(postings)
+    values = []
+    sizes = []
+    for term in terms:
+        entries = postings[term]
+        previous = 0
+        start = len(values)
+        values.append(len(entries))
+        for doc, _ in entries:
+            values.append(doc - previous)
+            previous = doc
+        values.extend(len(positions) for _, positions in entries)
+        for _, positions in entries:
+            last = 0
+            for position in positions:
+                values.append(position - last)
+                last = position
+        sizes.append(len(values) - start)
+    buf, lengths = encode_varints(np.array(values, dtype=np.uint64))
+    value_ends = np.cumsum(sizes)
+    byte_ends = np.cumsum(lengths)[value_ends - 1] if len(terms) else np.empty(0, dtype=np.int64)
+    offsets = np.concatenate(([0], byte_ends)).astype(np.int64)
+    array = pa.LargeBinaryArray.from_buffers(pa.large_binary(), len(terms),
+                                             [None, pa.py_buffer(offsets), pa.py_buffer(buf)])
+    return pa.table({'term': pa.array(terms, pa.string()), 'postings': array}, schema=SEGMENT_SCHEMA)
+
+
+def tokenize(texts):
+    """清理文本后用 jieba 分词（经分词缓存），去掉空白，英文转小写"""
+    cleaned = clean_series(pd.Series(list(texts), dtype=object))
+    token_lists = get_token_store().tokens(cleaned.tolist(), 'jieba')
+    return [[token.lower() for token in tokens if token.strip()] for tokens in token_lists]
+
+
+def parse_query(query):
+    """把查询拆成若干子句，每个子句是一个词或一个短语（词列表），子句之间为“与”
+
+    引号中的内容为短语；未加引号的词分词后多于一个词时也按短语匹配。
+    """
+    clauses = [next(group for group in match.groups() if group) for match in _PHRASE_RE.finditer(query)]
+    return [tokens for tokens in tokenize(clauses) if tokens]
+
+
+class TextIndex:
+    """热搜标题和评论的倒排全文索引
+
+    文档为一次热搜（同一话题、同一标题在同一小时内只记一次）或一条评论，
+    记录时间、话题/微博ID和原文。索引按段增量写入：每次更新把新文档编码为
+    一个新段（倒排表 + 文档表两个 Parquet 文件），来源重新导入时旧文档只
+    标记删除，段数过多时合并并清除已删除的文档。倒排表常驻内存，查询时只
+    解码涉及的词，按时间和类型过滤后再读取命中文档的原文。
+    """
+
+    def __init__(self, directory=DEFAULT_INDEX_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.meta_path = os.path.join(directory, 'meta.json')
+        # processed 为已索引的快照文件名，补录的旧快照按文件识别
+        self.meta = {'next_doc': 0, 'next_segment': 0, 'segments': [], 'sources': {}, 'deleted': [],
+                     'processed': []}
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                self.meta.update(json.load(f))
+            # 旧版本按时间水位线记录的字段
+            for key in ('last_snapshot', 'last_hour', 'last_hour_keys'):
+                self.meta.pop(key, None)
+        self._load()
+
+    def _path(self, name, segment):
+        return os.path.join(self.directory, f'{name}-{segment["id"]:06d}.parquet')
+
+    def _load(self):
+        """读取所有段的倒排表和文档的时间、类型，重建删除标记"""
+        size = self.meta['next_doc']
+        self.times = np.full(size, np.datetime64('NaT'), dtype='datetime64[s]')
+        self.kinds = np.zeros(size, dtype=np.int8)
+        self.alive = np.zeros(size, dtype=bool)
+        self.terms = {}
+        self._buffers = []
+        self._texts = {}
+        for segment in self.meta['segments']:
+            docs = pq.read_table(self._path('docs', segment), columns=['doc_id', '类型', '时间'])
+            doc_ids = docs.column('doc_id').to_numpy()
+            self.times[doc_ids] = docs.column('时间').to_numpy().astype('datetime64[s]')
+            self.kinds[doc_ids] = docs.column('类型').to_numpy()
+            self.alive[doc_ids] = True
+            self._add_postings(pq.read_table(self._path('postings', segment)))
+        for first, end in self.meta['deleted']:
+            self.alive[first:end] = False
+
+    def _add_postings(self, table):
+        """登记一个段的倒排表：词 -> [(缓冲区编号, 起始, 结束), ...]，字节留在原缓冲区中"""
+        array = table.column('postings').combine_chunks()
+        _, offsets, data = array.buffers()
+        offsets = np.frombuffer(offsets, dtype=np.int64)[array.offset:array.offset + len(array) + 1]
+        buf = np.frombuffer(data, dtype=np.uint8) if data is not None else np.empty(0, dtype=np.uint8)
+        number = len(self._buffers)
+        self._buffers.append(buf)
+        for term, start, end in zip(table.column('term').to_pylist(), offsets[:-1].tolist(), offsets[1:].tolist()):
+            self.terms.setdefault(term, []).append((number, start, end))
+
+    def _grow(self, size):
+        extra = size - len(self.times)
+        if extra > 0:
+            self.times = np.concatenate([self.times, np.full(extra, np.datetime64('NaT'), dtype='datetime64[s]')])
+            self.kinds = np.concatenate([self.kinds, np.zeros(extra, dtype=np.int8)])
+            self.alive = np.concatenate([self.alive, np.zeros(extra, dtype=bool)])
+
+    def _write_segment(self, kind, times, ids, texts, token_lists):
+        """把一批文档写成新段，返回 (第一个文档ID, 结束文档ID)"""
+        keep = [i for i, tokens in enumerate(token_lists) if tokens]
+        first = self.meta['next_doc']
+        end = first + len(keep)
+        if not keep:
+            return first, end
+        doc_ids = np.arange(first, end)
+        postings = {}
+        for doc, i in zip(doc_ids.tolist(), keep):
+            positions = {}
+            for position, token in enumerate(token_lists[i]):
+                positions.setdefault(token, []).append(position)
+            for token, token_positions in positions.items():
+                postings.setdefault(token, []).append((doc, token_positions))
+
+        segment = {'id': self.meta['next_segment'], 'first': first, 'end': end}
+        times = pd.to_datetime(pd.Series(times).iloc[keep]).to_numpy().astype('datetime64[s]')
+        code = KINDS.index(kind)
+        docs = pa.table({
+            'doc_id': pa.array(doc_ids, pa.int64()),
+            '类型': pa.array(np.full(len(keep), code, dtype=np.int8)),
+            '时间': pa.array(times, pa.timestamp('s')),
+            'ID': pa.array([ids[i] for i in keep], pa.string()),
+            '文本': pa.array([texts[i] for i in keep], pa.string()),
+        })
+        pq.write_table(docs, self._path('docs', segment))
+        table = encode_segment(postings)
+        pq.write_table(table, self._path('postings', segment))
+
+        self._grow(end)
+        self.times[first:end] = times
+        self.kinds[first:end] = code
+        self.alive[first:end] = True
+        self._add_postings(table)
+        self.meta['segments'].append(segment)
+        self.meta['next_segment'] += 1
+        self.meta['next_doc'] = end
+        return first, end
+
+    def add_snapshots(self, root=DEFAULT_STORE_ROOT):
+        """从快照库补录还没有索引的热搜标题，返回新增的文档数
+
+        同一话题（没有ID时按标题）在同一小时内的多次上榜只记为一篇文档，
+        时间取该小时内第一次出现的快照时间。按快照文件记录处理进度，补录的
+        旧快照也会被索引，并与同一小时内已索引的标题去重。
+        """
+        df, names = read_new_snapshots(root, self.meta['processed'], columns=['ID', '日期时间', '标题'])
+        self.meta['processed'] = sorted(set(self.meta['processed']) | set(names))
+        df = df[df['标题'].notna()]
+        if df.empty:
+            return 0
+        df = df.sort_values('日期时间', kind='stable')
+        ids = df['ID'].astype(str)
+        titles = df['标题'].astype(str)
+        hours = df['日期时间'].dt.floor('h')
+        keys = title_keys(ids, titles)
+        first = ~pd.DataFrame({'key': keys, 'hour': hours}).duplicated()
+        # 同一小时内已经索引过的话题不再重复记录
+        indexed = self._indexed_title_keys(hours.unique())
+        first &= ~pd.Series(list(zip(keys, hours)), index=df.index).isin(indexed)
+
+        new = df[first.to_numpy()]
+        start, end = self._write_segment('标题', new['日期时间'], ids[first].tolist(), titles[first].tolist(),
+                                         tokenize(titles[first]))
+        return end - start
+
+    def _indexed_title_keys(self, hours):
+        """给定小时内已索引的热搜标题，返回 {(去重键, 小时)}"""
+        hours = np.asarray(pd.DatetimeIndex(hours).to_numpy(), dtype='datetime64[h]')
+        docs = np.flatnonzero(self.alive & (self.kinds == KINDS.index('标题')))
+        docs = docs[np.isin(self.times[docs].astype('datetime64[h]'), hours)]
+        if not len(docs):
+            return set()
+        texts = pd.concat([self._segment_texts(segment).reindex(docs[(docs >= segment['first']) &
+                                                                     (docs < segment['end'])])
+                           for segment in self.meta['segments']])
+        keys = title_keys(texts['ID'].astype(str), texts['文本'].astype(str))
+        doc_hours = pd.to_datetime(self.times[texts.index.to_numpy()].astype('datetime64[h]'))
+        return set(zip(keys, doc_hours))
+
+    def add_frame(self, source, df, text_column='评论', time_column='日期', id_column='微博ID', kind='评论'):
+        """索引一个来源（如一个源文件）的文档，替换该来源之前的文档，返回文档数
+
+        没有 text_column 列的来源（如只有标题的热搜文件）记为没有文档的来源。
+        """
+        self.remove(source)
+        if text_column not in df.columns:
+            self.meta['sources'][source] = [self.meta['next_doc'], self.meta['next_doc']]
+            return 0
+        df = df[df[text_column].map(lambda x: isinstance(x, str))]
+        if time_column in df.columns:
+            times = df[time_column]
+            if not pd.api.types.is_datetime64_any_dtype(times):
+                times = parse_comment_time(times.astype(object))
+        else:
+            times = pd.Series(pd.NaT, index=df.index)
+        ids = df[id_column].astype(str).tolist() if id_column in df.columns else [''] * len(df)
+        texts = df[text_column].tolist()
+        first, end = self._write_segment(kind, times, ids, texts, tokenize(texts))
+        self.meta['sources'][source] = [first, end]
+        return end - first
+
+    def remove(self, source):
+        """标记删除某个来源的所有文档"""
+        doc_range = self.meta['sources'].pop(source, None)
+        if doc_range is not None and doc_range[1] > doc_range[0]:
+            self.meta['deleted'].append(doc_range)
+            self.alive[doc_range[0]:doc_range[1]] = False
+
+    def save(self):
+        """保存元数据（先写临时文件再替换）；段数过多时先合并"""
+        if len(self.meta['segments']) > MAX_SEGMENTS:
+            self.compact()
+            return
+        atomic_json(self.meta_path, self.meta, indent=2)
+        get_token_store().flush()
+
+    def compact(self):
+        """把所有段合并为一个段，并清除已删除的文档"""
+        old_segments = self.meta['segments']
+        if not old_segments:
+            return
+        postings = {}
+        for term in self.terms:
+            docs, counts, positions = self._postings(term)
+            keep = self.alive[docs]
+            if not keep.any():
+                continue
+            splits = np.split(positions, np.cumsum(counts)[:-1])
+            postings[term] = [(doc, split.tolist()) for doc, split, alive in zip(docs.tolist(), splits, keep) if alive]
+
+        docs = pa.concat_tables([pq.read_table(self._path('docs', segment)) for segment in old_segments])
+        docs = docs.filter(pa.array(self.alive[docs.column('doc_id').to_numpy()]))
+        segment = {'id': self.meta['next_segment'], 'first': old_segments[0]['first'], 'end': self.meta['next_doc']}
+        pq.write_table(docs, self._path('docs', segment))
+        pq.write_table(encode_segment(postings), self._path('postings', segment))
+
+        self.meta['segments'] = [segment]
+        self.meta['next_segment'] += 1
+        self.meta['deleted'] = []
+        self.save()
+        for old in old_segments:
+            for name in ('docs', 'postings'):
+                os.remove(self._path(name, old))
+        self._load()
+
+    def _postings(self, term):
+        """某个词在所有段中的倒排表（含已删除的文档）"""
+        parts = [decode_postings(self._buffers[number][start:end]) for number, start, end in self.terms.get(term, [])]
+        if not parts:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty
+        if len(parts) == 1:
+            return parts[0]
+        return tuple(np.concatenate(columns) for columns in zip(*parts))
+
+    def _phrase_docs(self, tokens):
+        """包含连续短语的文档ID：各词的 (文档, 位置 - 词序) 取交集"""
+        postings = [self._postings(token) for token in tokens]
+        # 先按文档取交集（从最短的倒排表开始），只在候选文档中比较位置
+        candidates = None
+        for docs, _, _ in sorted(postings, key=lambda item: len(item[0])):
+            candidates = docs if candidates is None else np.intersect1d(candidates, docs, assume_unique=True)
+        if len(tokens) == 1 or not len(candidates):
+            return candidates
+        keys = None
+        for i, (docs, counts, positions) in enumerate(postings):
+            selected = np.repeat(np.isin(docs, candidates, assume_unique=True), counts)
+            starts = positions[selected] - i
+            token_keys = (np.repeat(docs, counts)[selected] << POSITION_BITS) | (starts & ((1 << POSITION_BITS) - 1))
+            token_keys = token_keys[starts >= 0]
+            keys = token_keys if keys is None else np.intersect1d(keys, token_keys, assume_unique=True)
+        return np.unique(keys >> POSITION_BITS)
+
+    def match(self, query, start=None, end=None, kind=None):
+        """返回命中查询的文档ID数组（按时间排序）
+
+        start/end 为时间范围（含），kind 为 '标题' 或 '评论'。
+        """
+        clauses = parse_query(query)
+        if not clauses:
+            return np.empty(0, dtype=np.int64)
+        docs = None
+        for tokens in clauses:
+            matched = self._phrase_docs(tokens)
+            docs = matched if docs is None else np.intersect1d(docs, matched, assume_unique=True)
+        docs = docs[self.alive[docs]]
+        mask = np.ones(len(docs), dtype=bool)
+        if start is not None:
+            mask &= self.times[docs] >= np.datetime64(pd.Timestamp(start), 's')
+        if end is not None:
+            mask &= self.times[docs] <= np.datetime64(pd.Timestamp(end), 's')
+        if kind is not None:
+            mask &= self.kinds[docs] == KINDS.index(kind)
+        docs = docs[mask]
+        return docs[np.argsort(self.times[docs], kind='stable')]
+
+    def _segment_texts(self, segment):
+        if segment['id'] not in self._texts:
+            table = pq.read_table(self._path('docs', segment), columns=['doc_id', 'ID', '文本'])
+            self._texts[segment['id']] = table.to_pandas().set_index('doc_id')
+        return self._texts[segment['id']]
+
+    def search(self, query, start=None, end=None, kind=None, limit=100):
+        """全文检索，返回最新的 limit 条命中文档（类型、时间、ID、文本）"""
+        docs = self.match(query, start, end, kind)[::-1][:limit]
+        frames = []
+        for segment in self.meta['segments']:
+            selected = docs[(docs >= segment['first']) & (docs < segment['end'])]
+            if len(selected):
+                frames.append(self._segment_texts(segment).reindex(selected))
+        result = pd.concat(frames) if frames else pd.DataFrame(columns=['ID', '文本'])
+        result = result.reindex(docs)
+        result.insert(0, '时间', pd.to_datetime(self.times[docs]))
+        result.insert(0, '类型', [KINDS[code] for code in self.kinds[docs]])
+        result.index.name = 'doc_id'
+        return result
+
+    def count(self, query, start=None, end=None, kind=None):
+        return len(self.match(query, start, end, kind))
+
+    def trend(self, query, freq='D', start=None, end=None, kind=None):
+        """命中文档数按时间分组（freq 同 pandas，如 'h'、'D'）"""
+        docs = self.match(query, start, end, kind)
+        times = pd.Series(pd.to_datetime(self.times[docs])).dropna()
+        return times.groupby(times.dt.floor(freq)).size().rename('文档数')
+
+    def report(self):
+        return (f'全文索引: {int(self.alive.sum())} 篇文档, {len(self.terms)} 个词, '
+                f'{len(self.meta["segments"])} 个段, {len(self.meta["sources"])} 个来源')
+
+
+if __name__ == '__main__':
+    # 用法: python text_index.py [快照库目录] [评论文件...]
+    index = TextIndex()
+    added = index.add_snapshots(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_STORE_ROOT)
+    print(f'新增 {added} 条热搜标题')
+    for path in sys.argv[2:]:
+        frame = pd.read_parquet(path) if path.endswith('.parquet') else pd.read_excel(path)
+        print(f'{path}: 索引 {index.add_frame(os.path.abspath(path), frame)} 条评论')
+    index.save()
+    print(index.report())
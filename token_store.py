@@ -0,0 +1,206 @@
+import atexit
+import glob
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from multiprocessing import parent_process
+
+import jieba
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from bayes_scorer import get_scorer
+from io_utils import atomic_write
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_DIR = 'token_cache'
+# 内存中最多保留的分词结果条数，以及新结果攒够多少条写一次分片
+DEFAULT_MEMORY_SIZE = 20000
+DEFAULT_FLUSH_EVERY = 5000
+# 分片按 key 排序写出，行组较小时按 key 查找只需读取少数行组
+ROW_GROUP_SIZE = 4096
+# 分片数超过该值时，主进程写分片后自动合并
+MAX_PARTS = 32
+
+# 分词器：jieba 供词频/词云使用，snownlp 与情感模型的特征一致
+SEGMENTERS = {
+    'jieba': jieba.lcut,
+    'snownlp': lambda text: get_scorer().tokenize(text),
+}
+
+SCHEMA = pa.schema([
+    ('segmenter', pa.dictionary(pa.int8(), pa.string())),
+    ('key', pa.string()),
+    ('tokens', pa.list_(pa.string())),
+])
+
+
+def token_key(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def key_fingerprints(keys):
+    """key（32 位十六进制）的前 64 位，用于在内存中判断 key 是否已落盘"""
+    if not len(keys):
+        return np.empty(0, dtype=np.uint64)
+    raw = np.frombuffer(bytes.fromhex(''.join(keys)), dtype='>u8')
+    return raw[::2].astype(np.uint64)
+
+
+def write_part(directory, table):
+    """按 key 排序后写成一个新的分片文件"""
+    os.makedirs(directory, exist_ok=True)
+    table = table.sort_by('key')
+    path = os.path.join(directory, f'part-{time.time_ns()}-{os.getpid()}.parquet')
+    return atomic_write(path, lambda tmp_path: pq.write_table(table, tmp_path, row_group_size=ROW_GROUP_SIZE))
+
+
+class TokenStore:
+    """分词结果的持久化缓存
+
+    每条清理后的文本按分词器各分词一次，结果以 Arrow 列表列写入 Parquet
+    分片文件（目录下 part-*.parquet），之后的运行直接复用。内存中只有
+    一个最多 maxsize 条的 LRU 和不超过 flush_every 条的待写结果；LRU 未命中的
+    文本按批到分片中查找（分片按 key 排序，只读取可能包含这些 key 的行组）。
+    为了让新文本不必查盘，每个分词器在内存中保留已落盘 key 的 64 位指纹
+    （每条 8 字节）。
+    """
+
+    def __init__(self, directory=DEFAULT_STORE_DIR, maxsize=DEFAULT_MEMORY_SIZE, flush_every=DEFAULT_FLUSH_EVERY):
+        self.directory = directory
+        self.maxsize = maxsize
+        self.flush_every = flush_every
+        self._lru = OrderedDict()
+        self._pending = {}
+        self._fingerprints = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _parts(self):
+        return sorted(glob.glob(os.path.join(self.directory, 'part-*.parquet')))
+
+    def _stored(self, segmenter):
+        """已落盘 key 的有序指纹数组，首次使用某个分词器时只读取 key 列"""
+        if segmenter not in self._fingerprints:
+            keys = []
+            for path in self._parts():
+                try:
+                    table = pq.read_table(path, filters=[('segmenter', '=', segmenter)], columns=['key'])
+                except (OSError, pa.ArrowInvalid) as e:
+                    logger.error(f"读取分词缓存 {path} 失败: {e}")
+                    continue
+                keys.extend(table.column('key').to_pylist())
+            self._fingerprints[segmenter] = np.unique(key_fingerprints(keys))
+        return self._fingerprints[segmenter]
+
+    def _lookup(self, segmenter, keys):
+        """到分片中查找一批 key，返回 {key: 分词列表}"""
+        stored = self._stored(segmenter)
+        fingerprints = key_fingerprints(keys)
+        position = np.minimum(np.searchsorted(stored, fingerprints), max(len(stored) - 1, 0))
+        candidates = [key for key, hit in zip(keys, stored[position] == fingerprints if len(stored) else []) if hit]
+        if not candidates:
+            return {}
+        try:
+            table = ds.dataset(self._parts(), schema=SCHEMA, format='parquet').to_table(
+                columns=['key', 'tokens'],
+                filter=(ds.field('segmenter') == segmenter) & ds.field('key').isin(sorted(candidates)))
+        except (OSError, pa.ArrowInvalid) as e:
+            logger.error(f"读取分词缓存失败: {e}")
+            return {}
+        return dict(zip(table.column('key').to_pylist(), table.column('tokens').to_pylist()))
+
+    def _remember(self, item, tokens):
+        self._lru[item] = tokens
+        self._lru.move_to_end(item)
+        if len(self._lru) > self.maxsize:
+            self._lru.popitem(last=False)
+
+    def tokens(self, texts, segmenter='jieba'):
+        """返回与 texts 一一对应的分词列表，缓存中没有的才实际分词"""
+        pending = self._pending.setdefault(segmenter, {})
+        keys = [token_key(text) for text in texts]
+        results = [self._lru.get((segmenter, key), pending.get(key)) for key in keys]
+        missing = {key for key, tokens in zip(keys, results) if tokens is None}
+        found = self._lookup(segmenter, list(missing)) if missing else {}
+        segment = SEGMENTERS[segmenter]
+        for i, (text, key) in enumerate(zip(texts, keys)):
+            tokens = results[i]
+            if tokens is None:
+                tokens = found.get(key)
+            if tokens is None:
+                self.misses += 1
+                tokens = segment(text)
+                found[key] = tokens
+                pending[key] = tokens
+            else:
+                self.hits += 1
+            self._remember((segmenter, key), tokens)
+            results[i] = tokens
+        if sum(map(len, self._pending.values())) >= self.flush_every:
+            self.flush()
+        return results
+
+    def flush(self):
+        """把新分词结果写成一个新的分片文件"""
+        rows = [(segmenter, key, tokens)
+                for segmenter, pending in self._pending.items()
+                for key, tokens in pending.items()]
+        if not rows:
+            return
+        segmenters, keys, tokens = zip(*rows)
+        table = pa.table({'segmenter': list(segmenters), 'key': list(keys), 'tokens': list(tokens)}, schema=SCHEMA)
+        write_part(self.directory, table)
+        for segmenter, pending in self._pending.items():
+            if segmenter in self._fingerprints:
+                self._fingerprints[segmenter] = np.union1d(self._fingerprints[segmenter],
+                                                           key_fingerprints(list(pending)))
+        self._pending.clear()
+        # 子进程只写分片，合并交给主进程，避免多个进程同时合并、删除同一批文件
+        if parent_process() is None:
+            self.compact()
+
+    def compact(self, max_parts=MAX_PARTS):
+        """分片过多时合并（去重后保留最新结果）
+
+        最大的分片比其余分片加起来还大时保留不动，只合并其余分片，
+        每次合并的数据量与新增结果同一量级，不会每次都重写整个缓存。
+        """
+        parts = self._parts()
+        if len(parts) <= max_parts:
+            return
+        sizes = {path: os.path.getsize(path) for path in parts}
+        largest = max(parts, key=sizes.get)
+        if sizes[largest] > sum(sizes.values()) - sizes[largest]:
+            parts.remove(largest)
+        table = pa.concat_tables([pq.read_table(path, schema=SCHEMA) for path in parts])
+        frame = table.to_pandas().drop_duplicates(subset=['segmenter', 'key'], keep='last')
+        write_part(self.directory, pa.Table.from_pandas(frame, schema=SCHEMA, preserve_index=False))
+        for old in parts:
+            os.remove(old)
+
+    def report(self):
+        return f"分词缓存命中 {self.hits} 条, 新分词 {self.misses} 条"
+
+
+_store = None
+
+
+def get_token_store():
+    """获取当前进程的默认分词缓存（目录可用环境变量 WEIBO_TOKEN_STORE 指定）"""
+    global _store
+    if _store is None or _store._pid != os.getpid():
+        _store = TokenStore(os.environ.get('WEIBO_TOKEN_STORE', DEFAULT_STORE_DIR))
+        _store._pid = os.getpid()
+    return _store
+
+
+@atexit.register
+def _flush_on_exit():
+    if _store is not None and _store._pid == os.getpid():
+        _store.flush()
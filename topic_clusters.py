@@ -0,0 +1,410 @@
+import glob
+import json
+import math
+import os
+import sys
+import zlib
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from snapshot_store import DEFAULT_STORE_ROOT, read_new_snapshots
+from text_index import tokenize
+from analytics_cube import CubeStore, HIST_COLUMNS, UNKNOWN
+from io_utils import atomic_json, atomic_write
+
+DEFAULT_CLUSTER_DIR = 'topic_clusters'
+
+# 特征哈希的维度：词和字二元组经 crc32 映射到固定维度，不需要维护词表
+HASH_DIM = 1 << 18
+# 每个簇中心只保留权重最大的若干维，近邻查找也只用这些维建索引
+MAX_CENTROID_TERMS = 32
+# 查找近邻时只用新标题权重最大的若干维
+QUERY_TERMS = 8
+# 每一维最多记录的簇数（保留最近活跃的）
+MAX_POSTINGS = 64
+# 话题统计的分片数超过该值时合并为一个分片
+MAX_TOPIC_PARTS = 32
+
+CLUSTER_SCHEMA = pa.schema([
+    ('簇', pa.int64()),
+    ('代表标题', pa.string()),
+    ('话题数', pa.int64()),
+    ('活跃时间', pa.timestamp('s')),
+    ('特征', pa.list_(pa.int32())),
+    ('权重', pa.list_(pa.float32())),
+])
+TOPIC_COLUMNS = ['ID', '标题', '簇', '首次上榜', '最后上榜', '上榜次数', '最高热度', '最高排名']
+
+
+def title_features(tokens, title):
+    """标题的特征：jieba 分词加上去掉空白后的字二元组，二元组能把“高考英语”和“高考 英语”对上"""
+    text = ''.join(title.split()).lower()
+    return tokens + [text[i:i + 2] for i in range(len(text) - 1)]
+
+
+def hash_features(features):
+    """特征名哈希为维度下标，返回 {维度: 词频}"""
+    counts = {}
+    for feature in features:
+        index = zlib.crc32(feature.encode('utf-8')) % HASH_DIM
+        counts[index] = counts.get(index, 0) + 1
+    return counts
+
+
+def normalize(vector):
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    return {index: weight / norm for index, weight in vector.items()} if norm else {}
+
+
+def truncate(vector, size=MAX_CENTROID_TERMS):
+    """只保留权重最大的 size 维并重新归一化"""
+    if len(vector) > size:
+        vector = dict(sorted(vector.items(), key=lambda item: -item[1])[:size])
+    return normalize(vector)
+
+
+def cosine(vector, centroid):
+    """两个已归一化稀疏向量的余弦相似度"""
+    if len(vector) > len(centroid):
+        vector, centroid = centroid, vector
+    return sum(weight * centroid.get(index, 0.0) for index, weight in vector.items())
+
+
+class Cluster:
+    """一个话题簇：稀疏中心向量和已分配的话题数"""
+
+    __slots__ = ('centroid', 'count', 'label', 'active')
+
+    def __init__(self, centroid, label, active):
+        self.centroid = centroid
+        self.count = 0
+        self.label = label
+        self.active = active
+
+
+class TopicClusterer:
+    """热搜标题的增量话题聚类
+
+    标题表示为哈希 TF-IDF 稀疏向量（文档频率随新标题累加），按快照分批
+    处理：每批只处理第一次出现的话题ID，用倒排近邻索引（簇中心的主要维度 ->
+    簇）找候选簇，余弦相似度不低于 threshold 的并入最相似的簇，否则新建簇；
+    一批分配完后按小批量 k-means 更新簇中心（学习率为本批话题数 / 簇内话题数）。
+    超过 expire_days 未上榜的簇不再接收新话题，保存时归档到 archive 目录并
+    移出内存和索引，簇中心文件只包含活跃的簇。热度等统计按话题累计，每次
+    更新只把变化的话题追加为 topics 目录下的一个分片（同一话题以最新分片为准，
+    分片过多时合并），查询时再按簇汇总；评论情感从分析立方体按话题ID汇总。
+    """
+
+    def __init__(self, directory=DEFAULT_CLUSTER_DIR, threshold=0.4, expire_days=7):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.threshold = threshold
+        self.expire = np.timedelta64(expire_days * 24, 'h')
+        self.meta_path = os.path.join(directory, 'meta.json')
+        self.clusters_path = os.path.join(directory, 'clusters.parquet')
+        self.topics_dir = os.path.join(directory, 'topics')
+        self.archive_dir = os.path.join(directory, 'archive')
+        self.df_path = os.path.join(directory, 'df.npy')
+
+        # processed 为已处理的快照文件名，补录的旧快照按文件识别
+        self.meta = {'documents': 0, 'next_cluster': 0, 'processed': []}
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                self.meta.update(json.load(f))
+            self.meta.pop('last_snapshot', None)
+        self.df = np.load(self.df_path) if os.path.exists(self.df_path) else np.zeros(HASH_DIM, dtype=np.int32)
+        self._topics = pd.DataFrame(columns=TOPIC_COLUMNS).astype({'簇': 'int64', '上榜次数': 'int64'})
+        self._topics.index.name = '话题'
+        parts = self._topic_parts()
+        if parts:
+            topics = pd.concat([pd.read_parquet(path) for path in parts])
+            self._topics = topics[~topics.index.duplicated(keep='last')]
+        self._known = set(self._topics.index)
+        # 还没有合并进 _topics 的更新，以及还没有写入分片的更新
+        self._updates = []
+        self._unsaved = []
+        self.clusters = {}
+        self.index = {}
+        if os.path.exists(self.clusters_path):
+            table = pq.read_table(self.clusters_path).to_pydict()
+            for cluster_id, label, count, active, features, weights in zip(
+                    table['簇'], table['代表标题'], table['话题数'], table['活跃时间'], table['特征'], table['权重']):
+                cluster = Cluster(dict(zip(features, weights)), label, np.datetime64(active, 's'))
+                cluster.count = count
+                self.clusters[cluster_id] = cluster
+            # 按活跃时间从旧到新建索引，每一维的候选簇列表里较新的排在后面
+            for cluster_id in sorted(self.clusters, key=lambda c: self.clusters[c].active):
+                self._index(cluster_id)
+
+    @property
+    def topics(self):
+        """全部话题的统计，同一话题取最新的一次更新"""
+        if self._updates:
+            topics = pd.concat([self._topics] + self._updates)
+            self._topics = topics[~topics.index.duplicated(keep='last')]
+            self._updates = []
+        return self._topics
+
+    def _topic_parts(self):
+        return sorted(glob.glob(os.path.join(self.topics_dir, 'part-*.parquet')))
+
+    def _latest(self, keys):
+        """已有话题的最新统计，只查找给定的话题"""
+        frames = [frame.loc[frame.index.intersection(keys)] for frame in [self._topics] + self._updates]
+        old = pd.concat(frames)
+        return old[~old.index.duplicated(keep='last')]
+
+    def _index(self, cluster_id):
+        for index in self.clusters[cluster_id].centroid:
+            postings = self.index.setdefault(index, {})
+            postings.pop(cluster_id, None)
+            postings[cluster_id] = None
+            if len(postings) > MAX_POSTINGS:
+                del postings[next(iter(postings))]
+
+    def _unindex(self, cluster_id):
+        for index in self.clusters[cluster_id].centroid:
+            postings = self.index.get(index)
+            if postings is not None:
+                postings.pop(cluster_id, None)
+
+    def _vectorize(self, counts_list):
+        """把一批标题的词频转换为归一化的 TF-IDF 向量，同时累加文档频率"""
+        for counts in counts_list:
+            self.df[list(counts)] += 1
+        self.meta['documents'] += len(counts_list)
+        n = self.meta['documents']
+        return [normalize({index: (1 + math.log(tf)) * (math.log((1 + n) / (1 + self.df[index])) + 1)
+                           for index, tf in counts.items()})
+                for counts in counts_list]
+
+    def _nearest(self, vector, now):
+        """在倒排索引中找候选簇，返回 (最相似的簇, 相似度)"""
+        candidates = set()
+        for index, _ in sorted(vector.items(), key=lambda item: -item[1])[:QUERY_TERMS]:
+            candidates.update(self.index.get(index, ()))
+        best, best_score = None, 0.0
+        for cluster_id in candidates:
+            cluster = self.clusters[cluster_id]
+            if now - cluster.active > self.expire:
+                continue
+            score = cosine(vector, cluster.centroid)
+            if score > best_score:
+                best, best_score = cluster_id, score
+        return best, best_score
+
+    def add_batch(self, keys, titles, now):
+        """把一批新话题分配到簇（小批量更新），返回 {话题: 簇}"""
+        now = np.datetime64(pd.Timestamp(now), 's')
+        token_lists = tokenize(titles)
+        vectors = self._vectorize([hash_features(title_features(tokens, title))
+                                   for tokens, title in zip(token_lists, titles)])
+        assigned = {}
+        batch = {}
+        for key, title, vector in zip(keys, titles, vectors):
+            cluster_id, score = self._nearest(vector, now) if vector else (None, 0.0)
+            if cluster_id is None or score < self.threshold:
+                # 新簇的中心先取这条标题，本批后面的相似标题可以直接并入
+                cluster_id = self.meta['next_cluster']
+                self.meta['next_cluster'] += 1
+                self.clusters[cluster_id] = Cluster(truncate(vector), title, now)
+                self._index(cluster_id)
+            assigned[key] = cluster_id
+            batch.setdefault(cluster_id, []).append(vector)
+
+        for cluster_id, members in batch.items():
+            cluster = self.clusters[cluster_id]
+            cluster.count += len(members)
+            rate = len(members) / cluster.count
+            mean = {}
+            for vector in members:
+                for index, weight in vector.items():
+                    mean[index] = mean.get(index, 0.0) + weight / len(members)
+            centroid = {index: (1 - rate) * weight for index, weight in cluster.centroid.items()}
+            for index, weight in mean.items():
+                centroid[index] = centroid.get(index, 0.0) + rate * weight
+            self._unindex(cluster_id)
+            cluster.centroid = truncate(centroid)
+            cluster.active = max(cluster.active, now)
+            self._index(cluster_id)
+        return assigned
+
+    def update(self, root=DEFAULT_STORE_ROOT):
+        """从快照库补录还没有处理的快照（包括补录的旧快照），返回新分配的话题数"""
+        df, names = read_new_snapshots(root, self.meta['processed'],
+                                       columns=['ID', '日期时间', '排名', '标题', '热度值'])
+        self.meta['processed'] = sorted(set(self.meta['processed']) | set(names))
+        df = df[df['标题'].notna()]
+        if df.empty:
+            if names:
+                self.save()
+            return 0
+        df = df.sort_values('日期时间', kind='stable')
+        ids = df['ID'].astype(str)
+        # 没有ID的条目（置顶、广告等）按标题区分
+        df = df.assign(话题=ids.where(ids != '', '#' + df['标题'].astype(str)), 标题=df['标题'].astype(str))
+
+        # 每次快照为一批，只处理第一次出现的话题
+        new = df.drop_duplicates('话题')
+        new = new[~new['话题'].isin(self._known)]
+        assigned = {}
+        for snapshot_time, group in new.groupby('日期时间', sort=True):
+            assigned.update(self.add_batch(group['话题'].tolist(), group['标题'].tolist(), snapshot_time))
+
+        self._update_topics(df, new, assigned)
+        self.save()
+        return len(assigned)
+
+    def _update_topics(self, df, new, assigned):
+        """按话题累计上榜次数、首末上榜时间、最高热度和最高排名"""
+        grouped = df.groupby('话题', sort=False)
+        stats = pd.DataFrame({
+            '首次上榜': grouped['日期时间'].min(),
+            '最后上榜': grouped['日期时间'].max(),
+            '上榜次数': grouped.size(),
+            '最高热度': grouped['热度值'].max(),
+            '最高排名': grouped['排名'].min(),
+        })
+        added = new.set_index('话题')[['ID', '标题']].assign(簇=pd.Series(assigned, dtype='int64'))
+        old = self._latest(stats.index.difference(added.index))
+        # 补录的旧快照可能早于已有记录，首末上榜时间都取两者的极值
+        stats.loc[old.index, '首次上榜'] = pd.concat([stats.loc[old.index, '首次上榜'], old['首次上榜']], axis=1).min(axis=1)
+        stats.loc[old.index, '最后上榜'] = pd.concat([stats.loc[old.index, '最后上榜'], old['最后上榜']], axis=1).max(axis=1)
+        stats.loc[old.index, '上榜次数'] += old['上榜次数']
+        stats.loc[old.index, '最高热度'] = pd.concat([stats.loc[old.index, '最高热度'], old['最高热度']], axis=1).max(axis=1)
+        stats.loc[old.index, '最高排名'] = pd.concat([stats.loc[old.index, '最高排名'], old['最高排名']], axis=1).min(axis=1)
+        stats = stats.join(pd.concat([old[['ID', '标题', '簇']], added]))[TOPIC_COLUMNS]
+        # 已有话题再次上榜时，所在的簇同样视为活跃（已归档的簇不再恢复）
+        for cluster_id, active in stats.groupby('簇')['最后上榜'].max().items():
+            cluster = self.clusters.get(cluster_id)
+            if cluster is not None:
+                cluster.active = max(cluster.active, np.datetime64(active, 's'))
+        stats.index.name = '话题'
+        stats = stats.astype({'簇': 'int64', '上榜次数': 'int64', '最高热度': 'Int64', '最高排名': 'Int16'})
+        self._known.update(stats.index)
+        self._updates.append(stats)
+        self._unsaved.append(stats)
+
+    def _archive_expired(self):
+        """把超过 expire_days 未上榜的簇写入归档分片，并移出内存和索引，返回归档的簇数"""
+        if not self.clusters:
+            return 0
+        latest = max(cluster.active for cluster in self.clusters.values())
+        expired = sorted(c for c, cluster in self.clusters.items() if latest - cluster.active > self.expire)
+        if not expired:
+            return 0
+        os.makedirs(self.archive_dir, exist_ok=True)
+        parts = glob.glob(os.path.join(self.archive_dir, 'part-*.parquet'))
+        number = max((int(os.path.basename(path)[5:-8]) for path in parts), default=-1) + 1
+        path = os.path.join(self.archive_dir, f'part-{number:06d}.parquet')
+        table = self._cluster_table(expired)
+        atomic_write(path, lambda tmp_path: pq.write_table(table, tmp_path))
+        for cluster_id in expired:
+            self._unindex(cluster_id)
+            del self.clusters[cluster_id]
+        return len(expired)
+
+    def _cluster_table(self, cluster_ids):
+        return pa.table({
+            '簇': cluster_ids,
+            '代表标题': [self.clusters[c].label for c in cluster_ids],
+            '话题数': [self.clusters[c].count for c in cluster_ids],
+            '活跃时间': [self.clusters[c].active for c in cluster_ids],
+            '特征': [list(self.clusters[c].centroid) for c in cluster_ids],
+            '权重': [list(self.clusters[c].centroid.values()) for c in cluster_ids],
+        }, schema=CLUSTER_SCHEMA)
+
+    def _save_topics(self):
+        """把本次变化的话题追加为一个分片；分片过多时把全部话题合并为一个分片"""
+        parts = self._topic_parts()
+        if len(parts) >= MAX_TOPIC_PARTS:
+            frame, old_parts = self.topics, parts
+        elif self._unsaved:
+            frame = pd.concat(self._unsaved)
+            frame, old_parts = frame[~frame.index.duplicated(keep='last')], []
+        else:
+            return
+        os.makedirs(self.topics_dir, exist_ok=True)
+        number = int(os.path.basename(parts[-1])[5:-8]) + 1 if parts else 0
+        path = os.path.join(self.topics_dir, f'part-{number:06d}.parquet')
+        atomic_write(path, frame.to_parquet)
+        # 合并后的分片编号最大，删除旧分片前中断也不影响读取结果
+        for old in old_parts:
+            os.remove(old)
+        self._unsaved = []
+
+    def save(self):
+        """归档过期的簇，保存活跃簇中心、新的话题统计分片、文档频率和元数据
+
+        各文件都先写临时文件再替换。
+        """
+        self._archive_expired()
+        table = self._cluster_table(sorted(self.clusters))
+        atomic_write(self.clusters_path, lambda tmp_path: pq.write_table(table, tmp_path))
+        self._save_topics()
+        atomic_write(self.df_path, self._write_df)
+        atomic_json(self.meta_path, self.meta, indent=2)
+
+    def _write_df(self, path):
+        # 传入文件对象，np.save 不会给临时文件名再加 .npy 后缀
+        with open(path, 'wb') as f:
+            np.save(f, self.df)
+
+    def members(self, cluster_id):
+        """某个簇的全部话题，按最高热度降序"""
+        return self.topics[self.topics['簇'] == cluster_id].sort_values('最高热度', ascending=False)
+
+    def summary(self, cube=None, min_topics=1):
+        """按簇汇总热度和评论情感，按热度和降序
+
+        热度和为簇内各话题最高热度之和。传入 cube（analytics_cube.CubeStore）
+        时按评论的话题ID（comment_crawler 写入，与快照中的ID相同）汇总评论数和
+        平均情感得分，没有话题ID的评论不计入。
+        """
+        topics = self.topics
+        grouped = topics.groupby('簇')
+        # 已归档的簇用簇内热度最高的标题作为代表标题
+        hottest = topics.sort_values('最高热度', ascending=False).drop_duplicates('簇').set_index('簇')['标题']
+        labels = pd.Series({c: cluster.label for c, cluster in self.clusters.items()}, dtype=object)
+        result = pd.DataFrame({
+            '代表标题': labels.reindex(hottest.index).fillna(hottest),
+            '话题数': grouped.size(),
+            '上榜次数': grouped['上榜次数'].sum(),
+            '首次上榜': grouped['首次上榜'].min(),
+            '最后上榜': grouped['最后上榜'].max(),
+            '最高热度': grouped['最高热度'].max(),
+            '热度和': grouped['最高热度'].sum(),
+            '最高排名': grouped['最高排名'].min(),
+        })
+        result = result[result['话题数'] >= min_topics]
+        result['标题示例'] = [' / '.join(self.members(c)['标题'].head(3)) for c in result.index]
+
+        if cube is not None:
+            comments = cube.query(['话题ID'])
+            comments.index = comments.index.astype(str)
+            comments = comments[comments.index != UNKNOWN]
+            clusters = topics.assign(ID=topics['ID'].astype(str)).set_index('ID')['簇']
+            clusters = clusters[clusters.index != '']
+            comments = comments.join(clusters.groupby(level=0).first(), how='inner')
+            sums = comments.groupby('簇')[['数量', '得分和'] + HIST_COLUMNS].sum()
+            scored = sums[HIST_COLUMNS].sum(axis=1)
+            result['评论数'] = sums['数量'].reindex(result.index).fillna(0).astype('int64')
+            result['平均得分'] = (sums['得分和'] / scored.where(scored > 0)).round(4).reindex(result.index)
+        result.index.name = '簇'
+        return result.sort_values('热度和', ascending=False)
+
+    def report(self):
+        return f'话题聚类: {len(self.topics)} 个话题, {len(self.clusters)} 个活跃簇'
+
+
+if __name__ == '__main__':
+    # 用法: python topic_clusters.py [快照库目录] [评论立方体目录]
+    clusterer = TopicClusterer()
+    added = clusterer.update(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_STORE_ROOT)
+    print(f'新增 {added} 个话题')
+    print(clusterer.report())
+    cube = CubeStore(sys.argv[2]) if len(sys.argv) > 2 else None
+    print(clusterer.summary(cube, min_topics=2).head(20).to_string())
@@ -1,10 +1,28 @@
 import os
+import argparse
+import hashlib
+import json
+import random
+import time
+import traceback
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
-import re
-from openpyxl import Workbook
-from openpyxl.styles import Font
+from snapshot_store import append_snapshot, compact_closed_partitions
+from hotsearch_parser import parse_hot_page, parse_saved_pages
+from surge_detector import SurgeDetector, format_alert
+from export_writer import write_excel
+
+# 快照库目录；Excel 只作为可选导出（命令行 --export-excel 打开）
+SNAPSHOT_ROOT = 'weibohot_store'
+EXPORT_EXCEL = False
+EXCEL_COLUMNS = ["ID", "日期时间", "排名", "标题", "热度值", "热度类型", "链接"]
+HOT_URL = 'https://s.weibo.com/top/summary'
+# 上一次保存的榜单哈希，用于跳过未变化的快照（下划线开头，读取数据集时会被忽略）
+LAST_HASH_FILE = os.path.join(SNAPSHOT_ROOT, '_last_hash')
+# 突增检测的滑动统计
+SURGE_STATE_FILE = os.path.join(SNAPSHOT_ROOT, '_surge_state.json')
 
 cookies = {
     'SUB': '2A25FPrY7DeRhGeFG7lYS-SzLwjWIHXVmNbfzrDV6PUJbktAYLU7bkW1NeVi7r4VnATSLSpzI5EgN9Ijl-P8DoX77',
@@ -22,112 +40,155 @@ headers = {
 }
 
 
-def extract_weibo_id(url):
-    """从微博URL中提取ID"""
-    if not url:
-        print('该微博没有URL,跳过')
-        return ''
+def export_excel(hot_data, output_file):
+    """把热搜数据导出为 Excel 文件（只写模式，列宽按内容估算，标题行加粗）"""
+    rows = ([data[column] for column in EXCEL_COLUMNS] for data in hot_data)
+    write_excel(rows, EXCEL_COLUMNS, output_file, sheet_name="微博热搜")
 
-    # 尝试从多种URL格式中提取ID
-    patterns = [
-        r'weibo\.com/(\d+)/\w+',
-        r'weibo\.com/\w+/(\w+)',
-        r'status/(\w+)',
-        r'/(\w{9})(?:\?|$)',
-        r'q=([a-zA-Z0-9%]+)',
-        r'topic/(\d+)'
-    ]
 
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
-    return ''
+def fetch_hot_page(session=None):
+    """获取微博热搜页面HTML，传入 session 时复用其连接池"""
+    getter = session.get if session is not None else requests.get
+    response = getter(HOT_URL, cookies=cookies, headers=headers, timeout=30)
+    response.encoding = 'utf-8'
+    return response.text
 
-# 获取当前日期时间
-current_time = datetime.now().strftime("%Y%m%d%H%M")
 
-# 发送 HTTP 请求获取微博热搜页面
-response = requests.get('https://s.weibo.com/top/summary', cookies=cookies, headers=headers)
-response.encoding = 'utf-8'
-soup = BeautifulSoup(response.text, 'html.parser')
+def hot_data_hash(hot_data):
+    """热搜榜内容的哈希（不含抓取时间），用于判断榜单是否变化"""
+    fields = [[data[column] for column in EXCEL_COLUMNS if column != '日期时间'] for data in hot_data]
+    return hashlib.sha1(json.dumps(fields, ensure_ascii=False).encode('utf-8')).hexdigest()
 
-# 存储热搜数据的列表
-hot_data = []
 
-# 获取热搜列表（包括置顶的广告）
-hot_items = soup.select('#pl_top_realtimehot > table > tbody > tr')[:51]  # 前50个热搜+置顶
+def save_hot_data(hot_data, current_time, detector=None):
+    """保存一次快照：追加到快照库，可选导出 Excel，传入 detector 时做突增检测"""
+    # 数据存储：追加到按日期分区的 Parquet 快照库
+    store_path = append_snapshot(hot_data, SNAPSHOT_ROOT)
+    print(f"已成功爬取 {len(hot_data)} 条热搜数据并追加至 {store_path}")
 
-for item in hot_items:
+    # 可选：同时导出 Excel
+    if EXPORT_EXCEL:
+        output_file = f"weibo_hotsearch_{current_time}.xlsx"
+        export_excel(hot_data, output_file)
+        print(f"已导出 Excel 文件 {output_file}")
+
+    # 抓取时即检测热度和排名突增
+    if detector is not None:
+        for alert in detector.update(hot_data):
+            print(format_alert(alert))
+        detector.save()
+
+
+def load_last_hash():
+    """读取上一次保存的榜单哈希，进程重启后也能去重"""
+    try:
+        with open(LAST_HASH_FILE, 'r', encoding='utf-8') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def store_last_hash(digest):
+    os.makedirs(os.path.dirname(LAST_HASH_FILE), exist_ok=True)
+    with open(LAST_HASH_FILE, 'w', encoding='utf-8') as f:
+        f.write(digest)
+
+
+def scrape_once(session=None, last_hash=None, html_dir=None, detector=None):
+    """抓取并解析一次热搜；榜单与 last_hash 相同时不保存，返回本次的哈希
+
+    html_dir 不为空时同时保存原始页面，供离线回放和测试使用。
+    """
+    # 获取当前日期时间
+    current_time = datetime.now().strftime("%Y%m%d%H%M")
+
+    # 发送 HTTP 请求获取微博热搜页面
+    html = fetch_hot_page(session)
+    if html_dir:
+        os.makedirs(html_dir, exist_ok=True)
+        with open(os.path.join(html_dir, f"weibo_hotsearch_{current_time}.html"), 'w', encoding='utf-8') as f:
+            f.write(html)
+    hot_data = parse_hot_page(html, current_time)
+    if not hot_data:
+        print("未解析到热搜数据，跳过保存")
+        return last_hash
+
+    digest = hot_data_hash(hot_data)
+    if digest == last_hash:
+        print("热搜榜未变化，跳过保存")
+        return last_hash
+
+    save_hot_data(hot_data, current_time, detector)
+    store_last_hash(digest)
+    return digest
+
+
+def replay(paths):
+    """离线模式：解析已保存的页面并补录到快照库，不访问网络"""
+    last_hash = None
+    detector = SurgeDetector(state_path=SURGE_STATE_FILE)
+    for file_path, hot_data in parse_saved_pages(paths):
+        if not hot_data:
+            print(f"{file_path} 未解析到热搜数据")
+            continue
+        digest = hot_data_hash(hot_data)
+        if digest != last_hash:
+            save_hot_data(hot_data, hot_data[0]['日期时间'], detector)
+            last_hash = digest
+
+
+def run_daemon(interval=60, jitter=10, html_dir=None):
+    """常驻模式：复用一个会话，按带随机抖动的间隔轮询，榜单变化时才保存"""
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=2,
+                                          max_retries=Retry(total=3, backoff_factor=1,
+                                                            status_forcelist=[500, 502, 503, 504])))
+    last_hash = load_last_hash()
+    detector = SurgeDetector(state_path=SURGE_STATE_FILE)
+    print(f"常驻抓取已启动，间隔 {interval}±{jitter} 秒")
+    compacted_day = None
     try:
-        # 排名
-        rank_elem = item.select_one('td.ranktop')
-        rank = rank_elem.text.strip() if rank_elem else '置顶'
-
-        # 标题和链接
-        title_elem = item.select_one('td.td-02 a')
-        title = title_elem.text.strip() if title_elem else '未知'
-        href = title_elem.get('href') if title_elem else ''
-        full_url = f"https://s.weibo.com{href}" if href.startswith('/') else href
-
-        # 提取ID
-        weibo_id = extract_weibo_id(full_url)
-
-        # 热度值
-        hot_value_elem = item.select_one('td.td-02 span')
-        hot_value = hot_value_elem.text.strip() if hot_value_elem else '未知'
-
-        # 热度类型（如：沸、热、新等）
-        hot_type_elem = item.select_one('td.td-03 i')
-        hot_type = hot_type_elem.text.strip() if hot_type_elem else ''
-
-        hot_data.append({
-            '日期时间': current_time,
-            '排名': rank,
-            '标题': title,
-            '热度值': hot_value,
-            '热度类型': hot_type,
-            '链接': full_url,
-            'ID': weibo_id
-        })
-
-    except Exception as e:
-        print(f"解析单个热搜项时出错: {e}")
-        continue
-
-os.makedirs("weibohot", exist_ok=True)
-
-# 创建工作簿和工作表
-wb = Workbook()
-ws = wb.active
-ws.title = "微博热搜"
-
-# 添加标题行并设置字体为粗体
-headers = ["ID", "日期时间", "排名", "标题", "热度值", "热度类型", "链接"]
-ws.append(headers)
-for cell in ws[1]:
-    cell.font = Font(bold=True)
-
-# 写入数据
-for data in hot_data:
-    row = [
-        data['ID'],
-        data['日期时间'],
-        data['排名'],
-        data['标题'],
-        data['热度值'],
-        data['热度类型'],
-        data['链接']
-    ]
-    ws.append(row)
-
-# 调整列宽以适应内容
-for column_cells in ws.columns:
-    length = max(len(str(cell.value)) for cell in column_cells)
-    ws.column_dimensions[column_cells[0].column_letter].width = length * 1.2
-
-# 数据存储
-output_file = f"weibo_hotsearch_{current_time}.xlsx"
-wb.save(output_file)
-
-print(f"已成功爬取 {len(hot_data)} 条热搜数据并保存至 {output_file}")
\ No newline at end of file
+        while True:
+            started = time.monotonic()
+            try:
+                last_hash = scrape_once(session, last_hash, html_dir, detector)
+                # 启动时和跨天后，把已经结束的日期分区各合并为一个文件
+                today = datetime.now().strftime('%Y-%m-%d')
+                if today != compacted_day:
+                    compacted = compact_closed_partitions(SNAPSHOT_ROOT, today)
+                    if compacted:
+                        print(f"已合并 {compacted} 个日期分区的快照文件")
+                    compacted_day = today
+            except requests.RequestException as e:
+                print(f"请求出错: {e}")
+            except Exception as e:
+                # 解析、写入快照或合并分区出错时只跳过本轮，常驻进程继续运行
+                print(f"本轮抓取出错: {e!r}")
+                traceback.print_exc()
+            delay = interval + random.uniform(-jitter, jitter) - (time.monotonic() - started)
+            time.sleep(max(delay, 1))
+    except KeyboardInterrupt:
+        print("常驻抓取已停止")
+    finally:
+        session.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='微博热搜抓取')
+    parser.add_argument('--daemon', action='store_true', help='常驻轮询模式')
+    parser.add_argument('--interval', type=float, default=60, help='轮询间隔（秒）')
+    parser.add_argument('--jitter', type=float, default=10, help='间隔的随机抖动（秒）')
+    parser.add_argument('--save-html', metavar='DIR', help='同时保存原始页面到目录')
+    parser.add_argument('--replay', nargs='+', metavar='PATH', help='离线解析已保存的页面文件或目录')
+    parser.add_argument('--export-excel', action='store_true',
+                        help='每次快照同时导出 weibo_hotsearch_*.xlsx（供 weibohot_情感分析.py 等读取 Excel 的脚本使用）')
+    args = parser.parse_args()
+    EXPORT_EXCEL = args.export_excel
+
+    if args.replay:
+        replay(args.replay)
+    elif args.daemon:
+        run_daemon(args.interval, args.jitter, args.save_html)
+    else:
+        scrape_once(last_hash=load_last_hash(), html_dir=args.save_html,
+                    detector=SurgeDetector(state_path=SURGE_STATE_FILE))
\ No newline at end of file
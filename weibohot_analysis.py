@@ -1,13 +1,21 @@
 import pandas as pd
 import matplotlib.pyplot as plt
-import jieba
-from wordcloud import WordCloud
-from snownlp import SnowNLP
-from collections import Counter
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from itertools import chain, islice, tee
+import heapq
 import re
 from datetime import datetime
 import os
 import logging
+from sentiment_cache import get_cache
+from bayes_scorer import get_scorer
+from lexicon import get_matcher
+from token_store import get_token_store
+from hotsearch_reader import iter_hotsearch_chunks
+from frame_schema import compact_frame, memory_report, memory_usage
+from wordcloud_renderer import render_wordcloud, render_batch
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -27,71 +35,30 @@ def get_current_time():
     return datetime.now().strftime("%Y%m%d%H%M%S")
 
 
-def read_hotsearch_data(file_path):
-    """读取微博热搜数据"""
-    try:
-        # 尝试读取CSV格式
-        df = pd.read_csv(file_path, encoding='utf-8', on_bad_lines='warn')
-
-        # 检查列名并尝试自动识别
-        column_mapping = {
-            'title': '标题',
-            'content': '标题',
-            'name': '标题',
-            '热搜': '标题',
-            '话题': '标题',
-            'rank': '排名',
-            'hot': '热度值',
-            'score': '热度值',
-            'type': '热度类型',
-            'category': '热度类型'
-        }
+def read_hotsearch_data(file_path, chunksize=100000):
+    """读取微博热搜数据
 
-        # 重命名列
-        df = df.rename(columns=lambda x: column_mapping.get(x.lower(), x))
+    先按文件头判断格式再读取一次，需要流式处理时直接使用 iter_hotsearch_chunks。
+    """
+    try:
+        chunks = list(iter_hotsearch_chunks(file_path, chunksize))
+    except Exception as e:
+        logger.error(f"读取数据文件失败: {e}")
+        return pd.DataFrame()
+    if not chunks:
+        return pd.DataFrame()
+    df = pd.concat(chunks, ignore_index=True)
 
-        # 确保有标题列
-        if '标题' not in df.columns:
-            # 尝试通过内容推断标题列
-            for col in df.columns:
-                if df[col].dtype == 'object' and len(df[col].str.split()) > 0:
-                    df = df.rename(columns={col: '标题'})
-                    break
+    # 转换为紧凑列类型，排名中的置顶/广告单独记录
+    before = memory_usage(df)
+    df = compact_frame(df)
+    logger.info(memory_report(before, df))
+    return df
 
-        if '标题' not in df.columns:
-            raise ValueError("无法识别标题列，请检查数据格式")
 
-        return df
-
-    except Exception as e:
-        logger.error(f"读取CSV失败: {e}")
-        try:
-            # 尝试读取Excel格式
-            df = pd.read_excel(file_path)
-            return df
-        except:
-            logger.error("也未能读取Excel格式")
-
-        # 尝试读取txt格式
-        try:
-            data = []
-            with open(file_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line:
-                        # 尝试多种分隔符
-                        parts = re.split(r'[,|\t]', line)
-                        if len(parts) >= 3:  # 至少有排名、标题、热度
-                            data.append({
-                                '排名': parts[0],
-                                '标题': parts[1],
-                                '热度值': parts[2] if len(parts) > 2 else '',
-                                '热度类型': parts[3] if len(parts) > 3 else ''
-                            })
-            return pd.DataFrame(data)
-        except Exception as e:
-            logger.error(f"读取TXT失败: {e}")
-            return pd.DataFrame()
+# 预编译的清理规则：URL和特殊字符合并为一次替换，再压缩空白
+_NOISE_RE = re.compile(r'http\S+|www\S+|https\S+|[^\w\s]')
+_SPACE_RE = re.compile(r'\s+')
 
 
 def clean_text(text):
@@ -99,17 +66,113 @@ def clean_text(text):
     if not isinstance(text, str):
         return ""
 
-    # 去除URL
-    text = re.sub(r'http\S+|www\S+|https\S+', '', text, flags=re.MULTILINE)
-    # 去除特殊字符和标点
-    text = re.sub(r'[^\w\s]', '', text)
+    # 去除URL、特殊字符和标点
+    text = _NOISE_RE.sub('', text)
     # 去除空格和换行
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
+    return _SPACE_RE.sub(' ', text).strip()
+
+
+def clean_series(series):
+    """整列清理文本，结果与逐条 clean_text 一致
+
+    重复文本只清理一次，非字符串值清理为空字符串。
+    """
+    is_text = series.map(lambda x: isinstance(x, str))
+    uniques = pd.unique(series[is_text])
+    cleaned = dict(zip(uniques, map(clean_text, uniques)))
+    return series.where(is_text).map(cleaned).fillna('')
 
 
-def generate_wordcloud(text_data, output_path=None):
-    """生成词云"""
+def add_clean_column(df, column='标题'):
+    """在原列旁新增“清理后<列名>”列，供词云和情感分析共用"""
+    return df.assign(**{f'清理后{column}': clean_series(df[column])})
+
+
+# 扩展停用词列表
+STOPWORDS = frozenset([
+    '的', '了', '在', '是', '我', '有', '和', '就', '不', '人', '都', '一', '一个', '上', '也', '很', '到',
+    '说',
+    '要', '去', '你', '会', '着', '没有', '看', '好', '自己', '这', '那', '这个', '那个', '啊', '吧', '把',
+    '被',
+    '热搜', '微博', '话题', '更多', '视频', '搜索', '查看', '点击', '网页', '链接', '正在'
+])
+
+
+def count_words(token_lists, stopwords=STOPWORDS):
+    """过滤停用词和单字后统计词频"""
+    word_freq = Counter()
+    for tokens in token_lists:
+        for word in tokens:
+            word = word.strip()
+            if word and word not in stopwords and len(word) > 1:  # 过滤单个字符
+                word_freq[word] += 1
+    return word_freq
+
+
+def _iter_shards(iterable, size):
+    """把任意可迭代对象按 size 条切成分片，不整体载入内存"""
+    iterator = iter(iterable)
+    while True:
+        shard = list(islice(iterator, size))
+        if not shard:
+            return
+        yield shard
+
+
+def _count_shard(texts, cleaned=False):
+    """Map阶段：清理、分词（复用分词缓存）并在本分片内过滤停用词计数"""
+    if not cleaned:
+        texts = map(clean_text, texts)
+    store = get_token_store()
+    word_freq = count_words(store.tokens([t for t in texts if t], 'jieba'))
+    store.flush()
+    return word_freq
+
+
+def _init_wordfreq_worker():
+    """子进程初始化：预先加载jieba词典"""
+    import jieba
+    jieba.initialize()
+
+
+def build_word_freq(text_data, cleaned=False, workers=None, shard_size=5000, top_n=None):
+    """Map-Reduce 方式统计词频
+
+    输入按 shard_size 条切片后分发给进程池，各子进程独立分词计数，主进程
+    合并各分片的 Counter。同时在途的分片数有上限，内存占用与总数据量无关。
+    只有一个分片或 workers<=1 时串行计算。top_n 指定时只返回前 top_n 个词。
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    # 先取两个分片判断数据量，只有一个分片时不必启动进程池
+    shards = _iter_shards(text_data, shard_size)
+    head = list(islice(shards, 2))
+    shards = chain(head, shards)
+    word_freq = Counter()
+
+    if workers <= 1 or len(head) < 2:
+        for shard in shards:
+            word_freq.update(_count_shard(shard, cleaned))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_wordfreq_worker) as executor:
+            pending = set()
+            for shard in shards:
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        word_freq.update(future.result())
+                pending.add(executor.submit(_count_shard, shard, cleaned))
+            for future in pending:
+                word_freq.update(future.result())
+
+    if top_n:
+        return Counter(dict(word_freq.most_common(top_n)))
+    return word_freq
+
+
+def generate_wordcloud(text_data, output_path=None, cleaned=False, workers=None):
+    """生成词云，cleaned=True 表示 text_data 已经过 clean_text 清理"""
     if not text_data:
         logger.warning("没有可用的文本数据生成词云")
         return None
@@ -119,54 +182,15 @@ def generate_wordcloud(text_data, output_path=None):
         output_path = f"weibohot_worldcloud/{current_time}_wordcloud.png"
 
     try:
-        # 合并所有标题文本
-        all_text = ' '.join([clean_text(t) for t in text_data if clean_text(t)])
-
-        # 使用jieba进行中文分词
-        words = jieba.lcut(all_text)
-
-        # 扩展停用词列表
-        stopwords = set([
-            '的', '了', '在', '是', '我', '有', '和', '就', '不', '人', '都', '一', '一个', '上', '也', '很', '到',
-            '说',
-            '要', '去', '你', '会', '着', '没有', '看', '好', '自己', '这', '那', '这个', '那个', '啊', '吧', '把',
-            '被',
-            '热搜', '微博', '话题', '更多', '视频', '搜索', '查看', '点击', '网页', '链接', '正在'
-        ])
-
-        # 过滤停用词并统计词频
-        word_freq = Counter()
-        for word in words:
-            word = word.strip()
-            if word and word not in stopwords and len(word) > 1:  # 过滤单个字符
-                word_freq[word] += 1
+        # 使用jieba逐条分词（复用分词缓存），过滤停用词并分片并行统计词频
+        word_freq = build_word_freq(text_data, cleaned=cleaned, workers=workers)
 
         if not word_freq:
             logger.warning("没有有效的词汇生成词云")
             return None
 
-        # 生成词云
-        wordcloud = WordCloud(
-            font_path='simhei.ttf',
-            width=1200,
-            height=600,
-            background_color='white',
-            max_words=200,
-            collocations=False,  # 避免重复词语
-            scale=2  # 提高清晰度
-        ).generate_from_frequencies(word_freq)
-
-        # 保存词云图
-        wordcloud.to_file(output_path)
-
-        # 显示词云图
-        plt.figure(figsize=(12, 8))
-        plt.imshow(wordcloud, interpolation='bilinear')
-        plt.axis('off')
-        plt.title('微博热搜词云', fontsize=16)
-        plt.tight_layout()
-        plt.savefig(output_path, dpi=300, bbox_inches='tight', quality=95)
-        plt.close()
+        # 生成并保存词云图：只渲染一次，字体和词云参数跨调用缓存
+        render_wordcloud(word_freq, output_path, title='微博热搜词云')
 
         logger.info(f"词云已保存至 {output_path}")
         return word_freq
@@ -176,43 +200,72 @@ def generate_wordcloud(text_data, output_path=None):
         return None
 
 
+def generate_wordclouds(text_groups, output_dir="weibohot_worldcloud", cleaned=False, workers=None):
+    """批量生成词云，text_groups 为 {名称: 文本列表}，如各次快照或各话题
+
+    词频在主进程依次统计（复用分词缓存），渲染交给进程池并行。
+    返回 {名称: 图片路径}，没有有效词汇的分组跳过。
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = {}
+    for name, texts in text_groups.items():
+        word_freq = build_word_freq(texts, cleaned=cleaned, workers=1)
+        if word_freq:
+            jobs[name] = (word_freq, os.path.join(output_dir, f"{name}_wordcloud.png"), f"{name} 词云")
+    saved = set(render_batch(jobs.values(), workers=workers))
+    return {name: job[1] for name, job in jobs.items() if job[1] in saved}
+
+
 def contains_negative_words(text):
     """检查是否包含负面词汇"""
-    negative_words = [
-        '不', '没有', '未', '无', '拒绝', '反对', '抗议', '谴责', '批评', '指责',
-        '失望', '愤怒', '伤心', '难过', '痛苦', '悲剧', '灾难', '死亡', '事故', '失败',
-        '问题', '困难', '挑战', '危机', '冲突', '战争', '暴力', '犯罪', '诈骗', '欺骗'
-    ]
-    return any(word in text for word in negative_words)
+    return get_matcher().weigh(text)['negative'] > 0
 
 
 def contains_positive_words(text):
     """检查是否包含正面词汇"""
-    positive_words = [
-        '好', '优秀', '成功', '胜利', '开心', '快乐', '幸福', '喜悦', '满意', '赞成',
-        '支持', '庆祝', '成就', '进步', '发展', '创新', '突破', '冠军', '奖励', '荣誉',
-        '爱', '喜欢', '感谢', '感激', '美好', '漂亮', '精彩', '完美', '优秀', '强大'
-    ]
-    return any(word in text for word in positive_words)
+    return get_matcher().weigh(text)['positive'] > 0
 
 
-def analyze_sentiment(text):
-    """综合情感分析"""
-    text = clean_text(text)
-    if not text:
-        return None, 0.5  # 中性默认值
+def base_sentiment_scores(texts, namespace='clean'):
+    """批量获取SnowNLP基础情感分数
 
-    # 使用SnowNLP获取基础情感分数
-    try:
-        s = SnowNLP(text)
-        base_score = s.sentiments
-    except:
-        base_score = 0.5
+    先查缓存，未命中的文本交给向量化朴素贝叶斯打分器一次性计算后写回缓存。
+    """
+    cache = get_cache()
+    scores = [cache.get(text, namespace) for text in texts]
+    missing = [i for i, score in enumerate(scores) if score is None]
+    if missing:
+        token_lists = get_token_store().tokens([texts[i] for i in missing], 'snownlp')
+        computed = get_scorer().score_tokens(token_lists)
+        for i, score in zip(missing, computed):
+            scores[i] = float(score)
+            cache.put(texts[i], scores[i], namespace)
+    return scores
+
+
+def base_sentiment_score(text):
+    """SnowNLP基础情感分数，按清理后的文本读写缓存"""
+    return base_sentiment_scores([text])[0]
+
+
+def adjust_sentiment(text, base_score, weights=None, net_weight=False):
+    """根据关键词调整基础分数并分类
+
+    weights 为词典匹配结果 {'negative': 权重, 'positive': 权重}，
+    未传入时对文本单遍匹配一次。默认规则与原来一致：命中负面词时分数乘 0.7，
+    否则命中正面词时乘 1.3。net_weight 为真时改按净权重（正面减负面，截断到
+    [-1, 1]）调整，分数乘 1 + 0.3 * 净权重，正负相抵时不调整。
+    """
+    if weights is None:
+        weights = get_matcher().weigh(text)
 
     # 调整分数基于关键词
-    if contains_negative_words(text):
+    if net_weight:
+        net = max(-1.0, min(1.0, weights['positive'] - weights['negative']))
+        adjusted_score = base_score * (1 + 0.3 * net)
+    elif weights['negative'] > 0:
         adjusted_score = base_score * 0.7  # 降低分数
-    elif contains_positive_words(text):
+    elif weights['positive'] > 0:
         adjusted_score = base_score * 1.3  # 提高分数
     else:
         adjusted_score = base_score
@@ -229,9 +282,187 @@ def analyze_sentiment(text):
         return "neutral", adjusted_score
 
 
-def sentiment_analysis(text_data, output_prefix=None):
-    """情感分析并生成可视化结果和文本文件"""
-    if not text_data:
+def analyze_sentiment(text):
+    """综合情感分析"""
+    return analyze_cleaned_sentiment(clean_text(text))
+
+
+def analyze_cleaned_sentiment(text):
+    """对已清理的文本做综合情感分析"""
+    if not text:
+        return None, 0.5  # 中性默认值
+
+    # 使用SnowNLP获取基础情感分数（优先读缓存）
+    base_score = base_sentiment_score(text)
+    return adjust_sentiment(text, base_score)
+
+
+def analyze_cleaned_chunk(cleaned):
+    """analyze_cleaned_sentiment 的批量版本，基础分数整批计算"""
+    valid = [text for text in cleaned if text]
+    base_scores = iter(base_sentiment_scores(valid))
+    return [adjust_sentiment(text, next(base_scores)) if text else (None, 0.5) for text in cleaned]
+
+
+def analyze_sentiment_chunk(texts):
+    """analyze_sentiment 的批量版本"""
+    return analyze_cleaned_chunk([clean_text(text) for text in texts])
+
+
+def raw_sentiment_score(text):
+    """SnowNLP原始情感得分（保留两位小数），与合并脚本的打分方式一致
+
+    原始文本未经清理直接打分，因此单独使用 raw 命名空间缓存。
+    """
+    return raw_sentiment_chunk([text])[0]
+
+
+def raw_sentiment_chunk(texts):
+    """raw_sentiment_score 的批量版本"""
+    return [round(score, 2) for score in base_sentiment_scores([str(text) for text in texts], namespace='raw')]
+
+
+# 逐条打分函数对应的批量实现，score_texts 分块时优先使用
+_CHUNK_SCORERS = {
+    analyze_sentiment: analyze_sentiment_chunk,
+    analyze_cleaned_sentiment: analyze_cleaned_chunk,
+    raw_sentiment_score: raw_sentiment_chunk,
+}
+
+
+def _init_sentiment_worker():
+    """子进程初始化：预先展开SnowNLP情感模型，每个进程只加载一次"""
+    get_scorer()
+
+
+def _score_chunk(func, texts):
+    """对一个分块打分，有批量实现时整块计算"""
+    chunk_scorer = _CHUNK_SCORERS.get(func)
+    if chunk_scorer is not None:
+        return chunk_scorer(texts)
+    return [func(text) for text in texts]
+
+
+def _score_chunk_in_worker(func, texts):
+    """子进程打分：结束时落盘缓存，并把本分块的命中统计交回主进程"""
+    cache = get_cache()
+    hits, misses = cache.hits, cache.misses
+    scores = _score_chunk(func, texts)
+    cache.flush()
+    get_token_store().flush()
+    return scores, cache.hits - hits, cache.misses - misses
+
+
+@contextmanager
+def scoring_pool(workers=None):
+    """供多次打分共用的进程池（子进程按需启动，只加载一次模型）；workers<=1 时为 None"""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        yield None
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_sentiment_worker) as executor:
+        yield executor
+
+
+def iter_scores(text_data, func=analyze_sentiment, workers=None, chunk_size=500, executor=None):
+    """流式批量情感打分，按输入顺序逐条产出结果
+
+    text_data 可以是任意可迭代对象（例如分块读取文件的生成器），按 chunk_size
+    分块交给进程池，同时在途的分块数有上限，内存占用与输入总量无关。
+    传入 executor（见 scoring_pool）时复用该进程池，否则临时创建一个。
+    只有一个分块或 workers<=1 时串行计算。
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    # 先取两个分块判断数据量，只有一个分块时不必启动进程池
+    chunks = _iter_shards(text_data, chunk_size)
+    head = list(islice(chunks, 2))
+    chunks = chain(head, chunks)
+
+    if workers <= 1 or len(head) < 2:
+        for chunk in chunks:
+            scores = _score_chunk(func, chunk)
+            # 与子进程一致，每个分块结束时落盘，待写结果不会随输入累积
+            get_cache().flush()
+            get_token_store().flush()
+            yield from scores
+        return
+
+    if executor is not None:
+        yield from _iter_pool_scores(executor, chunks, func, workers)
+        return
+    with scoring_pool(workers) as executor:
+        yield from _iter_pool_scores(executor, chunks, func, workers)
+
+
+def _iter_pool_scores(executor, chunks, func, workers):
+    """把分块交给进程池，在途分块不超过 workers * 2 个，按顺序产出结果"""
+    cache = get_cache()
+    pending = deque()
+    for chunk in chunks:
+        if len(pending) >= workers * 2:
+            chunk_scores, hits, misses = pending.popleft().result()
+            cache.add_stats(hits, misses)
+            yield from chunk_scores
+        pending.append(executor.submit(_score_chunk_in_worker, func, chunk))
+    while pending:
+        chunk_scores, hits, misses = pending.popleft().result()
+        cache.add_stats(hits, misses)
+        yield from chunk_scores
+
+
+def score_texts(text_data, func=analyze_sentiment, workers=None, chunk_size=500, executor=None):
+    """批量情感打分
+
+    text_data 可以是任意可迭代对象或 pandas Series，func 为单条打分函数
+    （必须是模块级函数，以便传给子进程）。数据量不超过一个分块或 workers<=1
+    时直接串行计算，否则按 chunk_size 分块交给进程池。结果顺序与输入一致：
+    输入为 Series 时返回同索引的 Series，否则返回列表。传入 executor 时复用该进程池。
+    """
+    scores = list(iter_scores(text_data, func, workers=workers, chunk_size=chunk_size, executor=executor))
+    if isinstance(text_data, pd.Series):
+        return pd.Series(scores, index=text_data.index)
+    return scores
+
+
+class _ExampleHeap:
+    """固定大小的示例堆，只保留分数最高（或最低）的 size 条
+
+    同分时保留先出现的条目，结果与对全部示例做稳定排序后取前 size 条一致。
+    """
+
+    def __init__(self, size=20, largest=True):
+        self.size = size
+        self.sign = 1 if largest else -1
+        self._heap = []
+        self._seq = 0
+
+    def push(self, text, score):
+        item = (self.sign * score, -self._seq, text, score)
+        self._seq += 1
+        if len(self._heap) < self.size:
+            heapq.heappush(self._heap, item)
+        elif item > self._heap[0]:
+            heapq.heapreplace(self._heap, item)
+
+    def items(self):
+        return [(text, score) for _, _, text, score in sorted(self._heap, reverse=True)]
+
+
+# 情感得分直方图的分箱数（0-1 等宽）
+HIST_BINS = 20
+
+
+def sentiment_analysis(text_data, output_prefix=None, workers=None, chunk_size=500, cleaned_data=None):
+    """情感分析并生成可视化结果和文本文件
+
+    text_data 可以是任意可迭代对象，按流式处理：只保留各类计数、得分直方图
+    和每类最多20条示例，内存占用与输入规模无关。
+    cleaned_data 为与 text_data 一一对应的已清理文本，传入时跳过重复清理。
+    """
+    if hasattr(text_data, '__len__') and len(text_data) == 0:
         logger.warning("没有可用的文本数据进行情感分析")
         return None
 
@@ -245,17 +476,38 @@ def sentiment_analysis(text_data, output_prefix=None):
             'positive': {'count': 0, 'examples': []},
             'neutral': {'count': 0, 'examples': []},
             'negative': {'count': 0, 'examples': []},
+            'histogram': [0] * HIST_BINS,
             'total': 0
         }
-
-        for text in text_data:
-            sentiment, score = analyze_sentiment(text)
+        top_positive = _ExampleHeap(20, largest=True)
+        top_negative = _ExampleHeap(20, largest=False)
+
+        # 原文和待打分文本各取一份迭代器，tee 只缓存打分在途的部分
+        if cleaned_data is not None:
+            texts, pairs = tee(zip(text_data, cleaned_data))
+            texts = (text for text, _ in texts)
+            scored = iter_scores((cleaned for _, cleaned in pairs), analyze_cleaned_sentiment,
+                                 workers=workers, chunk_size=chunk_size)
+        else:
+            texts, to_score = tee(text_data)
+            scored = iter_scores(to_score, analyze_sentiment, workers=workers, chunk_size=chunk_size)
+
+        for text, (sentiment, score) in zip(texts, scored):
             if sentiment is None:
                 continue
 
             results[sentiment]['count'] += 1
-            results[sentiment]['examples'].append((text, score))
+            results['histogram'][min(int(score * HIST_BINS), HIST_BINS - 1)] += 1
             results['total'] += 1
+            if sentiment == 'positive':
+                top_positive.push(text, score)
+            elif sentiment == 'negative':
+                top_negative.push(text, score)
+            elif len(results['neutral']['examples']) < 20:
+                results['neutral']['examples'].append((text, score))
+
+        results['positive']['examples'] = top_positive.items()
+        results['negative']['examples'] = top_negative.items()
 
         if results['total'] == 0:
             logger.warning("没有有效的情感分析结果")
@@ -348,12 +600,14 @@ def main():
     logger.info(f"成功读取 {len(df)} 条热搜数据")
     logger.info("数据样例:\n" + str(df.head(3)))
 
-    # 提取标题列
-    titles = df['标题'].dropna().tolist()
+    # 提取标题列，并整列清理一次供词云和情感分析共用
+    df = add_clean_column(df.dropna(subset=['标题']), '标题')
+    titles = df['标题'].tolist()
+    cleaned_titles = df['清理后标题'].tolist()
 
     # 生成词云
     logger.info("开始生成词云...")
-    word_freq = generate_wordcloud(titles)
+    word_freq = generate_wordcloud(cleaned_titles, cleaned=True)
 
     if word_freq:
         # 打印高频词
@@ -363,7 +617,7 @@ def main():
 
     # 情感分析
     logger.info("开始情感分析...")
-    sentiment_result = sentiment_analysis(titles)
+    sentiment_result = sentiment_analysis(titles, cleaned_data=cleaned_titles)
 
     if sentiment_result:
         # 打印情感分析结果
@@ -372,6 +626,13 @@ def main():
         logger.info(f"中立: {sentiment_result['neutral']['count']}条 ({sentiment_result['neutral']['percent']:.1f}%)")
         logger.info(f"负面: {sentiment_result['negative']['count']}条 ({sentiment_result['negative']['percent']:.1f}%)")
 
+    get_cache().flush()
+    logger.info(get_cache().report())
+    store = get_token_store()
+    store.flush()
+    store.compact()
+    logger.info(store.report())
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
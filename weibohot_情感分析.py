@@ -1,43 +1,82 @@
 import pandas as pd
 import os
-from snownlp import SnowNLP
-
-# 获取当前目录
-file_dir = os.getcwd()
-
-# 获取指定目录下的所有文件
-file_names = os.listdir(file_dir)
-
-# 用于存储数据的列表
-dfs = []
-
-# 遍历文件列表
-for file_name in file_names:
-    # 检查文件是否为 Excel 文件（支持.xlsx 和.xls 格式）
-    if file_name.endswith(('.xlsx', '.xls')):
-        file_path = os.path.join(file_dir, file_name)
-        try:
-            # 读取 Excel 文件
-            excel_file = pd.ExcelFile(file_path)
-            # 获取所有表名
-            sheet_names = excel_file.sheet_names
-            for sheet_name in sheet_names:
-                # 获取指定工作表中的数据
-                df = excel_file.parse(sheet_name)
-                # 将数据添加到列表中
-                dfs.append(df)
-        except Exception as e:
-            print(f'读取文件 {file_name} 时出现错误: {e}')
-
-# 合并所有数据
-combined_df = pd.concat(dfs, ignore_index=True)
-
-# 假设评论列名为'评价'，对评论进行情感分析，并将结果保留两位小数
-if '标题' in combined_df.columns:
-    combined_df['情感得分'] = combined_df['标题'].apply(lambda x: round(SnowNLP(str(x)).sentiments, 2))
-else:
-    print("数据中不存在'标题'列，无法进行情感分析。")
-
-# 将合并后的数据保存为新的 Excel 文件
-output_file_path = '6.8热搜合并后的文件_情感分析.xlsx'
-combined_df.to_excel(output_file_path, index=False)
\ No newline at end of file
+from weibohot_analysis import score_texts, raw_sentiment_score
+from sentiment_cache import get_cache
+from merge_pipeline import merge_incremental, list_workbooks, ingest_workbooks
+from frame_schema import compact_frame, memory_report, memory_usage
+from export_writer import write_frame
+from snapshot_store import DEFAULT_STORE_ROOT, read_snapshots
+
+
+def score_snapshots(output_file_path, root=DEFAULT_STORE_ROOT, workers=None, chunk_size=1000):
+    """没有 Excel 文件时直接读取快照库的热搜数据打分，写出 output_file_path"""
+    # date 是分区目录的列，与日期时间重复
+    combined_df = read_snapshots(root).drop(columns='date', errors='ignore')
+    if combined_df.empty:
+        print(f"当前目录没有 Excel 文件，快照库 {root} 也没有数据。")
+        return None
+    combined_df = compact_frame(combined_df)
+
+    # 同一标题在多次快照中重复出现，每个标题只打分一次
+    titles = combined_df['标题'].astype(str)
+    unique_titles = titles.drop_duplicates()
+    scores = score_texts(unique_titles, raw_sentiment_score, workers=workers, chunk_size=chunk_size)
+    combined_df['情感得分'] = titles.map(pd.Series(scores.to_numpy(), index=unique_titles.to_numpy()))
+
+    write_frame(combined_df, output_file_path)
+    print(f"已从快照库 {root} 读取 {len(combined_df)} 条热搜并打分，保存至 {output_file_path}")
+    get_cache().flush()
+    print(get_cache().report())
+    return output_file_path
+
+
+def main(workers=None, chunk_size=1000, incremental=True, output_file_path='6.8热搜合并后的文件_情感分析.xlsx',
+         export_excel=False, store_root=DEFAULT_STORE_ROOT):
+    # 输出扩展名决定格式：.xlsx 为流式 Excel，.csv/.parquet 不经过 Excel
+    # 增量模式下可视化脚本直接读取分片目录，export_excel 为真时才导出合并文件
+
+    # weibo.py 默认只写快照库（加 --export-excel 才导出 Excel），没有 Excel 文件时改为读取快照库
+    if not list_workbooks(os.getcwd(), exclude=[output_file_path]):
+        score_snapshots(output_file_path, store_root, workers=workers, chunk_size=chunk_size)
+        return
+
+    if incremental:
+        # 增量模式：按文件清单只解析、打分新增或变化的文件，结果追加到分片目录
+        merge_incremental(os.getcwd(), '标题', output_file_path, workers=workers, chunk_size=chunk_size,
+                          export_excel=export_excel)
+        return
+
+    # 获取当前目录下的所有 Excel 文件（支持.xlsx 和.xls 格式），排除输出文件本身
+    file_paths = list_workbooks(os.getcwd(), exclude=[output_file_path])
+
+    # 用于存储数据的列表：并行读取所有工作表，列名和类型已统一
+    dfs = []
+    for _, sheets in ingest_workbooks(file_paths, workers):
+        dfs.extend(sheets)
+
+    # 合并所有数据
+    combined_df = pd.concat(dfs, ignore_index=True)
+
+    # 转换为紧凑列类型：排名/热度值解析为数值，重复字符串转为 category
+    before = memory_usage(combined_df)
+    combined_df = compact_frame(combined_df)
+    print(memory_report(before, combined_df))
+
+    # 假设评论列名为'评价'，对评论进行情感分析，并将结果保留两位小数
+    if '标题' in combined_df.columns:
+        # 多进程分块打分，每个子进程只加载一次模型，结果与逐条 apply 一致
+        combined_df['情感得分'] = score_texts(combined_df['标题'], raw_sentiment_score,
+                                          workers=workers, chunk_size=chunk_size)
+    else:
+        print("数据中不存在'标题'列，无法进行情感分析。")
+
+    # 将合并后的数据保存为新的文件（只写模式逐行写出 Excel）
+    write_frame(combined_df, output_file_path)
+
+    # 输出情感缓存命中统计
+    get_cache().flush()
+    print(get_cache().report())
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
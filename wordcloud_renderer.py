@@ -0,0 +1,120 @@
+from contextlib import contextmanager
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+import wordcloud.wordcloud as wordcloud_module
+from wordcloud import WordCloud
+
+from io_utils import pool_map
+
+# 默认的词云参数；调用时传入的同名参数覆盖默认值
+DEFAULT_SETTINGS = {
+    'font_path': 'simhei.ttf',
+    'width': 1200,
+    'height': 600,
+    'background_color': 'white',
+    'max_words': 200,
+    'collocations': False,  # 避免重复词语
+    'scale': 2,  # 提高清晰度
+}
+
+
+class _CachedImageFont:
+    """代替 wordcloud 模块中的 ImageFont：同一字体文件和字号只加载一次
+
+    wordcloud 在布局时对每个候选字号都调用一次 ImageFont.truetype，中文字体
+    文件动辄十几 MB，反复加载是渲染的主要开销之一。缓存只在 cached_fonts
+    范围内有效，退出后随对象释放。
+    """
+
+    def __init__(self):
+        self._fonts = {}
+
+    def truetype(self, font=None, size=10, *args, **kwargs):
+        key = (font, size, args, tuple(sorted(kwargs.items())))
+        if key not in self._fonts:
+            self._fonts[key] = ImageFont.truetype(font, size, *args, **kwargs)
+        return self._fonts[key]
+
+    def __getattr__(self, name):
+        return getattr(ImageFont, name)
+
+
+@contextmanager
+def cached_fonts():
+    """渲染期间让 wordcloud 模块复用已加载的字体，退出时恢复原来的 ImageFont
+
+    只替换 wordcloud.wordcloud 模块中的名字，并且只在 with 块内生效；
+    嵌套使用时复用外层的缓存。
+    """
+    current = wordcloud_module.ImageFont
+    if isinstance(current, _CachedImageFont):
+        yield current
+        return
+    fonts = wordcloud_module.ImageFont = _CachedImageFont()
+    try:
+        yield fonts
+    finally:
+        wordcloud_module.ImageFont = current
+
+
+@lru_cache(maxsize=16)
+def _get_wordcloud(settings):
+    return WordCloud(**dict(settings))
+
+
+def get_wordcloud(**settings):
+    """按参数缓存 WordCloud 对象，相同参数的多次渲染复用同一个对象"""
+    return _get_wordcloud(tuple(sorted({**DEFAULT_SETTINGS, **settings}.items())))
+
+
+def _add_title(image, title, font_path):
+    """在图片上方加一条标题栏"""
+    font = ImageFont.truetype(font_path, max(image.height // 20, 12))
+    bar = font.size * 2
+    canvas = Image.new('RGB', (image.width, image.height + bar), 'white')
+    canvas.paste(image, (0, bar))
+    ImageDraw.Draw(canvas).text((image.width // 2, bar // 2), title, fill='black', font=font, anchor='mm')
+    return canvas
+
+
+def render_wordcloud(word_freq, output_path, title=None, **settings):
+    """由词频渲染词云并保存，只渲染一次，不经过 matplotlib"""
+    with cached_fonts():
+        wordcloud = get_wordcloud(**settings).generate_from_frequencies(word_freq)
+        image = wordcloud.to_image()
+    if title:
+        image = _add_title(image, title, wordcloud.font_path)
+    image.save(output_path, optimize=True)
+    return output_path
+
+
+def _render_job(job):
+    """子进程渲染一张词云，出错时返回错误信息而不是抛出"""
+    word_freq, output_path, title, settings = job
+    try:
+        return render_wordcloud(word_freq, output_path, title, **settings), None
+    except Exception as e:
+        return output_path, str(e)
+
+
+def render_batch(jobs, workers=None, **settings):
+    """批量渲染词云，jobs 为 (词频, 输出路径) 或 (词频, 输出路径, 标题) 的列表
+
+    每个子进程缓存自己的 WordCloud 对象；workers<=1 或只有一张时串行。字体缓存
+    只在本次批量渲染期间有效（串行时整批共用，子进程各自一份）。
+    返回成功保存的路径列表，失败的打印错误后跳过。
+    """
+    jobs = [(job[0], job[1], job[2] if len(job) > 2 else None, settings) for job in jobs if job[0]]
+    with cached_fonts():
+        return _collect(pool_map(_render_job, jobs, workers))
+
+
+def _collect(results):
+    saved = []
+    for output_path, error in results:
+        if error is not None:
+            print(f'渲染词云 {output_path} 时出错: {error}')
+            continue
+        saved.append(output_path)
+    return saved
@@ -1,43 +1,75 @@
 import pandas as pd
 import os
-from snownlp import SnowNLP
-
-# 获取当前目录
-file_dir = os.getcwd()
-
-# 获取指定目录下的所有文件
-file_names = os.listdir(file_dir)
-
-# 用于存储数据的列表
-dfs = []
-
-# 遍历文件列表
-for file_name in file_names:
-    # 检查文件是否为 Excel 文件（支持.xlsx 和.xls 格式）
-    if file_name.endswith(('.xlsx', '.xls')):
-        file_path = os.path.join(file_dir, file_name)
-        try:
-            # 读取 Excel 文件
-            excel_file = pd.ExcelFile(file_path)
-            # 获取所有表名
-            sheet_names = excel_file.sheet_names
-            for sheet_name in sheet_names:
-                # 获取指定工作表中的数据
-                df = excel_file.parse(sheet_name)
-                # 将数据添加到列表中
-                dfs.append(df)
-        except Exception as e:
-            print(f'读取文件 {file_name} 时出现错误: {e}')
-
-# 合并所有数据
-combined_df = pd.concat(dfs, ignore_index=True)
-
-# 假设评论列名为'评论'，对评论进行情感分析，并将结果保留两位小数
-if '评论' in combined_df.columns:
-    combined_df['情感得分'] = combined_df['评论'].apply(lambda x: round(SnowNLP(str(x)).sentiments, 2))
-else:
-    print("数据中不存在'评论'列，无法进行情感分析。")
-
-# 将合并后的数据保存为新的 Excel 文件
-output_file_path = '6.8合并后的文件_情感分析.xlsx'
-combined_df.to_excel(output_file_path, index=False)
\ No newline at end of file
+from sentiment_cache import get_cache
+from merge_pipeline import (COMMENTS_DIR, merge_incremental, list_workbooks, ingest_workbooks, score_frame,
+                            split_sources)
+from frame_schema import compact_frame, memory_report, memory_usage
+from export_writer import write_frame
+from analytics_cube import CubeStore
+from text_index import TextIndex
+
+
+def main(workers=None, chunk_size=1000, incremental=True, output_file_path='6.8合并后的文件_情感分析.xlsx',
+         dedup=True, cube_dir='comment_cube', index_dir='text_index', export_excel=False):
+    # 输出扩展名决定格式：.xlsx 为流式 Excel，.csv/.parquet 不经过 Excel
+    # 增量模式下可视化脚本直接读取分片目录，export_excel 为真时才导出合并文件
+    # 按微博、话题、小时、地区、性别、svip 预聚合的计数和情感直方图保存在 cube_dir，供看板直接查询
+    cube = CubeStore(cube_dir)
+    # 评论全文索引（与热搜标题共用，标题由 text_index.py 从快照库补录），可按词、短语和时间检索
+    text_index = TextIndex(index_dir)
+
+    # comment_crawler 的输出写在 COMMENTS_DIR 子目录，两种模式都与当前目录下的文件一起合并
+    if incremental:
+        # 增量模式：按文件清单只解析、打分新增或变化的文件，结果追加到分片目录
+        merge_incremental(os.getcwd(), '评论', output_file_path, workers=workers, chunk_size=chunk_size,
+                          dedup=dedup, cube=cube, text_index=text_index, export_excel=export_excel,
+                          extra_dirs=[COMMENTS_DIR])
+        return
+
+    # 获取当前目录和评论抓取目录下的所有 Excel 文件（支持.xlsx 和.xls 格式）和 .jsonl 文件，排除输出文件本身
+    file_paths = list_workbooks(os.getcwd(), exclude=[output_file_path], extra_dirs=[COMMENTS_DIR])
+
+    # 用于存储数据的列表：并行读取所有工作表，列名和类型已统一；同时记录每个文件的行数
+    dfs = []
+    sources = []
+    for file_path, sheets in ingest_workbooks(file_paths, workers):
+        dfs.extend(sheets)
+        sources.append((file_path, sum(len(sheet) for sheet in sheets)))
+
+    # 合并所有数据
+    combined_df = pd.concat(dfs, ignore_index=True)
+
+    # 转换为紧凑列类型：性别、地区等重复字符串转为 category，svip 转为小整数
+    before = memory_usage(combined_df)
+    combined_df = compact_frame(combined_df)
+    print(memory_report(before, combined_df))
+
+    # 假设评论列名为'评论'，对评论进行情感分析，并将结果保留两位小数
+    # 转发、复制粘贴的评论先做近似去重，每簇只打分一次，“重复数”列记录簇大小
+    combined_df = score_frame(combined_df, '评论', workers=workers, chunk_size=chunk_size, dedup=dedup)
+
+    # 将合并后的数据保存为新的文件（只写模式逐行写出 Excel）
+    write_frame(combined_df, output_file_path)
+
+    # 全量模式重建分析立方体：与增量模式一样按源文件分别聚合，切换模式时不会重复计数
+    cube.clear()
+    for file_path, df in split_sources(combined_df, sources):
+        cube.update(file_path, df)
+    cube.save()
+    print(cube.report())
+
+    # 全量模式重建评论索引，同样按源文件分别索引
+    for source in list(text_index.meta['sources']):
+        text_index.remove(source)
+    for file_path, df in split_sources(combined_df, sources):
+        text_index.add_frame(file_path, df)
+    text_index.save()
+    print(text_index.report())
+
+    # 输出情感缓存命中统计
+    get_cache().flush()
+    print(get_cache().report())
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
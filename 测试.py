@@ -1,6 +1,6 @@
-import re
 import requests
 import pandas as pd
+from comment_crawler import parse_comment
 
 # 请求头（包含Cookie）
 headers = {
@@ -17,29 +17,11 @@ try:
     # 存储所有评论数据的列表
     comments_list = []
 
-    # 遍历每条评论
+    # 遍历每条评论，构建完整的评论信息字典
     for comment in response.json()['data']['data']:
-        # 获取用户信息
-        user = comment['user']
-
-        # 提取纯中文评论内容
-        content = ''.join(re.findall('[\u4e00-\u9fa5]+', comment['text']))
-
-        # 转换性别代码为中文
-        gender = '女' if user.get('gender') == 'f' else '男' if user.get('gender') == 'm' else '未知'
-
-        # 构建完整的评论信息字典
-        comment_data = {
-            '用户': user.get('screen_name', '未知用户'),
-            '性别': gender,
-            'svip': user.get('svip', 0),  # 0表示非SVIP，1表示SVIP
-            '地区': comment.get('source', '').replace('来自', '').strip() or '未知',
-            '评论': content,
-            '日期': comment.get('created_at', '未知日期')
-        }
-
+        comment_data = parse_comment(comment)
         comments_list.append(comment_data)
-        print(f"用户: {comment_data['用户']} | 性别: {gender} | 评论: {content[:30]}...")
+        print(f"用户: {comment_data['用户']} | 性别: {comment_data['性别']} | 评论: {comment_data['评论'][:30]}...")
 
     # 保存到Excel
     if comments_list:
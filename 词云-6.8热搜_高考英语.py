@@ -1,37 +1,31 @@
 import pandas as pd
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
 import os
+from weibohot_analysis import build_word_freq
+from token_store import get_token_store
+from wordcloud_renderer import render_wordcloud
 
-# 读取 Excel 文件
-excel_file = pd.ExcelFile('6.8热搜_高考英语.xlsx')
 
-# 获取指定工作表中的数据
-df = excel_file.parse('Sheet1')
+def main(workers=None):
+    # 读取 Excel 文件
+    excel_file = pd.ExcelFile('6.8热搜_高考英语.xlsx')
 
-# 提取评论列的数据，并去除缺失值后合并成一个字符串
-text = ' '.join(df['评论'].dropna())
+    # 获取指定工作表中的数据
+    df = excel_file.parse('Sheet1')
 
-# 设置图片清晰度
-plt.rcParams['figure.dpi'] = 300
+    # 提取评论列的数据，去除缺失值后分片并行分词、统计词频，只保留前 max_words 个词
+    word_freq = build_word_freq(df['评论'].dropna(), workers=workers, top_n=200)
 
-# 设置中文字体为 SimHei
-plt.rcParams['font.sans-serif'] = ['SimHei']
+    # 生成词云并保存到数据可视化文件夹：使用 SimHei 字体，直接渲染为图片，不经过 matplotlib
+    os.makedirs('数据可视化', exist_ok=True)
+    image_path = os.path.join('数据可视化', '词云-6.8热搜_高考英语.png')
+    render_wordcloud(word_freq, image_path, font_path=r'C:\Windows\Fonts\simhei.ttf',
+                     width=800, height=600, max_words=200, collocations=True, scale=3)
+    print(f"词云已保存至 {image_path}")
 
-# 创建词云对象，使用 SimHei 字体路径
-wordcloud = WordCloud(
-    font_path='C:\Windows\Fonts\simhei.ttf',
-    background_color='white',
-    width=800,
-    height=600
-).generate(text)
+    # 合并各分片子进程写下的分词结果
+    get_token_store().flush()
+    get_token_store().compact()
 
-# 显示词云
-plt.figure(figsize=(10, 5))
-plt.imshow(wordcloud, interpolation='bilinear')
-plt.axis('off')
-# 保存图片到数据可视化文件夹
-image_path = os.path.join('数据可视化', '词云-6.8热搜_高考英语.png')
-plt.savefig(image_path)
 
-plt.show()
\ No newline at end of file
+if __name__ == '__main__':
+    main()
\ No newline at end of file